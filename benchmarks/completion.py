@@ -0,0 +1,265 @@
+"""
+Measures ClangCompletion.on_query_completions on a generated C++ project
+outside of Sublime Text, using the stub sublime module in benchmarks/stubs.
+
+A typing session types a few scripted statements into every source file
+one character at a time, the way the editor reports them to the plugin,
+and times every completion request. Reports latency percentiles, results
+per request and the peak resident set size of the process.
+
+Run from the directory containing the package:
+
+    python3 -m SeaBlime.benchmarks.completion --classes 200 --headers 20
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs'))
+
+import sublime
+
+from ..clang import cindex
+from .project import completion_marker, generate
+
+# Statements typed at the completion marker of every source file
+typing_scripts = (
+    'object.compute',
+    'object.layer_lookup.',
+    'objects.front().desc',
+    'objects.back()->',
+    'std::unordered_',
+    'std::vector<int>::'
+)
+
+word_characters = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_'
+)
+
+
+def percentile(values, percent):
+    """Nearest rank percentile of the sorted list values."""
+
+    if not values:
+        return 0.0
+
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+
+    return values[max(rank, 1) - 1]
+
+
+def peak_rss():
+    """Peak resident set size of this process in megabytes."""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, OS X bytes
+    if sys.platform == 'darwin':
+        peak /= 1024.0
+
+    return peak / 1024.0
+
+
+def is_trigger(text, caret):
+    """True if typing the character before caret opens completions."""
+
+    character = text[caret - 1]
+
+    if character in word_characters or character == '.':
+        return True
+
+    return text[caret - 2:caret] in ('->', '::')
+
+
+def word_prefix(text, caret):
+    start = caret
+
+    while start > 0 and text[start - 1] in word_characters:
+        start -= 1
+
+    return text[start:caret]
+
+
+def type_script(listener, view, script, typing_delay):
+    """Types script at the caret and returns (seconds, results) per request."""
+
+    measurements = []
+
+    view.insert(view.caret, '\n    ')
+
+    for character in script:
+        view.insert(view.caret, character)
+
+        listener.on_modified(view)
+        listener.on_modified_async(view)
+
+        if not is_trigger(view.text, view.caret):
+            continue
+
+        prefix = word_prefix(view.text, view.caret)
+
+        started = time.perf_counter()
+
+        completions = listener.on_query_completions(view, prefix, [view.caret])
+
+        measurements.append((time.perf_counter() - started, len(completions or [])))
+
+        time.sleep(typing_delay)
+
+    view.insert(view.caret, ';')
+
+    return measurements
+
+
+def run_session(listener, window, source_file, typing_delay, pause):
+    with open(source_file) as source:
+        view = window.open_file(source_file, source.read())
+
+    view.caret = view.text.index(completion_marker) + len(completion_marker)
+
+    listener.on_activated_async(view)
+
+    measurements = []
+
+    for script in typing_scripts:
+        measurements += type_script(listener, view, script, typing_delay)
+
+        # Let the debounced reparse of the finished statement run
+        time.sleep(pause)
+
+    listener.on_close(view)
+
+    window.open_views.remove(view)
+
+    return measurements
+
+
+def report(arguments, first, measurements):
+    latencies = sorted(seconds * 1000 for seconds, _ in measurements)
+
+    results = [count for _, count in measurements]
+
+    summary = {
+        'classes': arguments.classes,
+        'headers': arguments.headers,
+        'template_depth': arguments.template_depth,
+        'requests': len(measurements) + 1,
+        'first_request_ms': first * 1000,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1] if latencies else 0.0,
+        'mean_results': float(sum(results)) / len(results) if results else 0.0,
+        'max_results': max(results) if results else 0,
+        'peak_rss_mb': peak_rss()
+    }
+
+    print('%(classes)d classes in %(headers)d headers, template depth %(template_depth)d' % summary)
+    print('%(requests)d requests, first took %(first_request_ms).1f ms' % summary)
+    print('latency    p50 %(p50_ms).1f ms  p95 %(p95_ms).1f ms  p99 %(p99_ms).1f ms  '
+          'max %(max_ms).1f ms' % summary)
+    print('results    mean %(mean_results).1f  max %(max_results)d per request' % summary)
+    print('peak RSS   %(peak_rss_mb).1f MB' % summary)
+
+    if arguments.json:
+        with open(arguments.json, 'w') as report_json:
+            json.dump(summary, report_json, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--classes', type=int, default=100)
+    parser.add_argument('--headers', type=int, default=10)
+    parser.add_argument('--template-depth', type=int, default=4)
+    parser.add_argument('--files', type=int, default=None,
+                        help='Number of source files to type in, all by default')
+    parser.add_argument('--directory', default=None,
+                        help='Where to generate the project, a temporary directory by default')
+    parser.add_argument('--typing-delay', type=int, default=80,
+                        help='Milliseconds between keystrokes')
+    parser.add_argument('--index', action='store_true',
+                        help='Index the whole project in the background while typing')
+    parser.add_argument('--out-of-process', action='store_true')
+    parser.add_argument('--max-completions', type=int, default=500)
+    parser.add_argument('--json', default=None, help='Also write the report to this file')
+    parser.add_argument('--library-path', default=None)
+    parser.add_argument('--library-file', default=None)
+
+    arguments = parser.parse_args()
+
+    if arguments.library_path:
+        cindex.conf.set_library_path(arguments.library_path)
+
+    if arguments.library_file:
+        cindex.conf.set_library_file(arguments.library_file)
+
+    # Loads libclang, so only after the library location is known
+    from .. import clang_integration
+
+    directory = arguments.directory or tempfile.mkdtemp(prefix='seablime-benchmark-')
+
+    sources = generate(
+        directory,
+        arguments.classes,
+        arguments.headers,
+        arguments.template_depth
+    )
+
+    window = sublime.Window({
+        'settings': {
+            'cmake': {
+                'build_cache': os.path.realpath(directory),
+                'lazy_index': not arguments.index,
+                'ast_cache': False,
+                'async_completion': False,
+                'max_completions': arguments.max_completions,
+                'out_of_process': arguments.out_of_process
+            }
+        }
+    })
+
+    listener = clang_integration.ClangCompletion()
+
+    try:
+        if clang_integration.create_database(window) is None:
+            print('Failed to load the compilation database in %s' % directory)
+
+            return
+
+        reparse_delay = window.project_data()['settings']['cmake'].get('reparse_delay', 500)
+
+        measurements = []
+
+        for source_file in sources[:arguments.files]:
+            measurements += run_session(
+                listener,
+                window,
+                source_file,
+                arguments.typing_delay / 1000.0,
+                reparse_delay / 1000.0 * 2
+            )
+
+        if not measurements:
+            print('No completion requests were made')
+
+            return
+
+        report(arguments, measurements[0][0], measurements[1:])
+    finally:
+        clang_integration.index_cache.detach(window)
+
+        window.close()
+
+        if arguments.directory is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Generates synthetic C++ projects to benchmark completion on, along with a
+compile_commands.json as CMake would export it.
+
+Every header declares its share of the classes, includes the header before
+it and a few standard headers, so a translation unit grows with the number
+of headers. Classes derive from nested class templates and hold standard
+containers, giving libclang deep template instantiations to complete in.
+"""
+
+import json
+import os
+
+standard_headers = (
+    'functional',
+    'map',
+    'memory',
+    'string',
+    'unordered_map',
+    'vector'
+)
+
+# Marks where typing sessions start in every source file
+completion_marker = '/* complete here */'
+
+
+def class_name(index):
+    return 'Class%d' % index
+
+
+def header_name(index):
+    return 'header_%d.h' % index
+
+
+def source_name(index):
+    return 'source_%d.cpp' % index
+
+
+def generate_header(index, classes, template_depth):
+    lines = ['#pragma once', '']
+
+    for header in standard_headers:
+        lines.append('#include <%s>' % header)
+
+    if index > 0:
+        lines.append('#include "%s"' % header_name(index - 1))
+
+    lines += [
+        '',
+        'namespace project%d {' % index,
+        '',
+        'template <typename T, int Depth>',
+        'struct Layer : Layer<std::vector<T>, Depth - 1> {',
+        '    T layer_value;',
+        '    std::map<std::string, T> layer_lookup;',
+        '};',
+        '',
+        'template <typename T>',
+        'struct Layer<T, 0> {',
+        '    std::unique_ptr<T> layer_root;',
+        '};',
+        ''
+    ]
+
+    for class_index in classes:
+        name = class_name(class_index)
+
+        lines += [
+            'class %s : public Layer<int, %d> {' % (name, template_depth),
+            'public:',
+            '    %s();' % name,
+            '    int compute_%d(int first_argument, double second_argument) const;' % class_index,
+            '    std::string describe_%d() const;' % class_index,
+            '    std::vector<std::shared_ptr<%s>> children_%d;' % (name, class_index),
+            '    std::unordered_map<std::string, std::function<void(int)>> handlers_%d;' % class_index,
+            '    %s* parent_%d;' % (name, class_index),
+            '    static const int identifier_%d = %d;' % (class_index, class_index),
+            '};',
+            ''
+        ]
+
+    lines += ['}', '']
+
+    return '\n'.join(lines)
+
+
+def generate_source(index, class_index):
+    return '\n'.join([
+        '#include "%s"' % header_name(index),
+        '',
+        'using namespace project%d;' % index,
+        '',
+        'int use_%d() {' % index,
+        '    %s object;' % class_name(class_index),
+        '    std::vector<%s> objects;' % class_name(class_index),
+        '    %s' % completion_marker,
+        '    return 0;',
+        '}',
+        ''
+    ])
+
+
+def generate(directory, classes=100, headers=10, template_depth=4):
+    """
+    Writes a project with the given number of classes spread over headers
+    into directory and returns the list of its source files.
+    """
+
+    directory = os.path.realpath(directory)
+
+    include_directory = os.path.join(directory, 'include')
+    source_directory = os.path.join(directory, 'src')
+
+    for path in (include_directory, source_directory):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    headers = max(1, min(headers, classes))
+
+    sources = []
+    commands = []
+
+    for index in range(headers):
+        header_classes = list(range(index, classes, headers))
+
+        with open(os.path.join(include_directory, header_name(index)), 'w') as header:
+            header.write(generate_header(index, header_classes, template_depth))
+
+        source_file = os.path.join(source_directory, source_name(index))
+
+        with open(source_file, 'w') as source:
+            source.write(generate_source(index, header_classes[0]))
+
+        sources.append(source_file)
+
+        commands.append({
+            'directory': directory,
+            'command': 'clang++ -std=c++11 -I%s -o %s.o -c %s' % (
+                include_directory,
+                source_file,
+                source_file
+            ),
+            'file': source_file
+        })
+
+    with open(os.path.join(directory, 'compile_commands.json'), 'w') as compile_commands:
+        json.dump(commands, compile_commands, indent=2)
+
+    return sources
@@ -0,0 +1,123 @@
+"""
+Compares ranking completions with completion.ranking.CandidateTable against
+plain prefix filtering followed by a sort on clang's priority.
+
+Run from the directory containing the package:
+
+    python3 -m SeaBlime.benchmarks.ranking [--candidates 20000]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from ..completion.ranking import CandidateTable
+
+
+def generate_candidates(count, seed=0):
+    generator = random.Random(seed)
+
+    words = [
+        ''.join(generator.choice(string.ascii_lowercase) for _ in range(generator.randint(2, 7)))
+        for _ in range(400)
+    ]
+
+    candidates = []
+
+    for _ in range(count):
+        parts = generator.sample(words, generator.randint(1, 4))
+
+        if generator.random() < 0.5:
+            typed_text = parts[0] + ''.join(part.capitalize() for part in parts[1:])
+        else:
+            typed_text = '_'.join(parts)
+
+        candidates.append((
+            '%s()\tint' % typed_text,
+            '%s()' % typed_text,
+            typed_text,
+            generator.choice((8, 20, 34, 50, 65, 70))
+        ))
+
+    return candidates
+
+
+def prefix_filter(candidates, prefix):
+    prefix = prefix.lower()
+
+    matches = [candidate for candidate in candidates if candidate[2].lower().startswith(prefix)]
+
+    return [candidate[:2] for candidate in sorted(matches, key=lambda candidate: candidate[3])]
+
+
+def measure(function, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+
+        result = function()
+
+        timings.append(time.perf_counter() - started)
+
+    return min(timings) * 1000, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--candidates', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=None)
+
+    arguments = parser.parse_args()
+
+    candidates = generate_candidates(arguments.candidates)
+
+    build_time, _ = measure(lambda: [CandidateTable(candidates)], arguments.repeat)
+
+    print('%d candidates, table built in %.2f ms' % (len(candidates), build_time))
+    print('%-10s %14s %8s %14s %8s %14s' % (
+        'query', 'prefix (ms)', 'hits', 'fuzzy (ms)', 'hits', 'typing (ms)'
+    ))
+
+    typed_word = candidates[len(candidates) // 2][2]
+
+    for length in range(1, min(len(typed_word), 6) + 1):
+        query = typed_word[:length]
+
+        prefix_time, prefix_hits = measure(
+            lambda: prefix_filter(candidates, query),
+            arguments.repeat
+        )
+
+        # A fresh table for every run, scoring the query from scratch
+        fuzzy_time, fuzzy_hits = measure(
+            lambda: CandidateTable(candidates).rank(query, arguments.limit),
+            arguments.repeat
+        )
+
+        # A table that saw every shorter query first, as while typing
+        def typing():
+            table = CandidateTable(candidates)
+
+            for prefix_length in range(1, length):
+                table.rank(query[:prefix_length], arguments.limit)
+
+            started = time.perf_counter()
+
+            table.rank(query, arguments.limit)
+
+            return time.perf_counter() - started
+
+        typing_time = min(typing() for _ in range(arguments.repeat)) * 1000
+
+        print('%-10s %14.2f %8d %14.2f %8d %14.2f' % (
+            query, prefix_time, prefix_hits,
+            fuzzy_time - build_time, fuzzy_hits,
+            typing_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Minimal stand-in for the sublime module, enough to import and drive the
+plugin outside of Sublime Text. Timeouts run on timer threads and View and
+Window only implement what the plugin uses, backed by a plain string.
+"""
+
+import json
+import tempfile
+import threading
+
+INHIBIT_WORD_COMPLETIONS = 8
+INHIBIT_EXPLICIT_COMPLETIONS = 16
+
+HIDE_ON_MOUSE_MOVE_AWAY = 2
+COOPERATE_WITH_AUTO_COMPLETE = 2
+
+open_windows = []
+
+status = []
+
+
+class Region(object):
+
+    a = None
+
+    b = None
+
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+
+class View(object):
+
+    view_id = None
+
+    window_ = None
+
+    path = None
+
+    text = None
+
+    changes = None
+
+    caret = None
+
+    lock = None
+
+    next_id = 1
+
+    def __init__(self, window, path, text):
+        self.view_id = View.next_id
+        self.window_ = window
+        self.path = path
+        self.text = text
+        self.changes = 0
+        self.caret = 0
+        self.lock = threading.Lock()
+
+        View.next_id += 1
+
+    def id(self):
+        return self.view_id
+
+    def window(self):
+        return self.window_
+
+    def file_name(self):
+        return self.path
+
+    def change_count(self):
+        return self.changes
+
+    def is_dirty(self):
+        return self.changes > 0
+
+    def size(self):
+        return len(self.text)
+
+    def substr(self, region):
+        if isinstance(region, int):
+            return self.text[region:region + 1]
+
+        with self.lock:
+            return self.text[region.begin():region.end()]
+
+    def rowcol(self, point):
+        row = self.text.count('\n', 0, point)
+
+        return row, point - (self.text.rfind('\n', 0, point) + 1)
+
+    def sel(self):
+        return [Region(self.caret)]
+
+    def scope_name(self, point):
+        return 'source.c++ '
+
+    def insert(self, point, characters):
+        with self.lock:
+            self.text = self.text[:point] + characters + self.text[point:]
+            self.changes += 1
+
+        if point <= self.caret:
+            self.caret += len(characters)
+
+        return len(characters)
+
+    def run_command(self, command, args=None):
+        pass
+
+
+class Window(object):
+
+    window_id = None
+
+    data = None
+
+    open_views = None
+
+    next_id = 1
+
+    def __init__(self, project_data=None):
+        self.window_id = Window.next_id
+        self.data = project_data or {}
+        self.open_views = []
+
+        Window.next_id += 1
+
+        open_windows.append(self)
+
+    def id(self):
+        return self.window_id
+
+    def project_data(self):
+        return self.data
+
+    def set_project_data(self, data):
+        self.data = data
+
+    def open_file(self, path, text):
+        view = View(self, path, text)
+
+        self.open_views.append(view)
+
+        return view
+
+    def views(self):
+        return list(self.open_views)
+
+    def active_view(self):
+        return self.open_views[-1] if self.open_views else None
+
+    def close(self):
+        open_windows.remove(self)
+
+
+def platform():
+    return 'linux'
+
+
+def version():
+    return '3000'
+
+
+def set_timeout(function, delay=0):
+    timer = threading.Timer(delay / 1000.0, function)
+    timer.daemon = True
+    timer.start()
+
+
+set_timeout_async = set_timeout
+
+
+def status_message(message):
+    status.append(message)
+
+
+def windows():
+    return list(open_windows)
+
+
+def active_window():
+    return open_windows[-1] if open_windows else None
+
+
+def cache_path():
+    return tempfile.gettempdir()
+
+
+def decode_value(value):
+    return json.loads(value)
+
+
+def encode_value(value, pretty=False):
+    return json.dumps(value, indent=4 if pretty else None)
@@ -0,0 +1,25 @@
+"""Minimal stand-in for the sublime_plugin module."""
+
+
+class EventListener(object):
+    pass
+
+
+class ApplicationCommand(object):
+    pass
+
+
+class WindowCommand(object):
+
+    window = None
+
+    def __init__(self, window):
+        self.window = window
+
+
+class TextCommand(object):
+
+    view = None
+
+    def __init__(self, view):
+        self.view = view
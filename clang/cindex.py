@@ -1709,6 +1709,25 @@ completionChunkKindMap = {
             19: CompletionChunk.Kind("HorizontalSpace"),
             20: CompletionChunk.Kind("VerticalSpace")}
 
+# Chunks whose text never varies, keyed like completionChunkKindMap. Optional
+# chunks have no text of their own, it lives in their nested CompletionString.
+completionChunkFixedText = {
+            0: '',
+            6: '(',
+            7: ')',
+            8: '[',
+            9: ']',
+            10: '{',
+            11: '}',
+            12: '<',
+            13: '>',
+            14: ', ',
+            16: ':',
+            17: ';',
+            18: ' = ',
+            19: ' ',
+            20: '\n'}
+
 class CompletionString(ClangObject):
     class Availability:
         def __init__(self, name):
@@ -1762,6 +1781,32 @@ availabilityKinds = {
             2: CompletionChunk.Kind("NotAvailable"),
             3: CompletionChunk.Kind("NotAccessible")}
 
+completionContexts = {
+            'Unexposed': 0,
+            'AnyType': 1 << 0,
+            'AnyValue': 1 << 1,
+            'ObjCObjectValue': 1 << 2,
+            'ObjCSelectorValue': 1 << 3,
+            'CXXClassTypeValue': 1 << 4,
+            'DotMemberAccess': 1 << 5,
+            'ArrowMemberAccess': 1 << 6,
+            'ObjCPropertyAccess': 1 << 7,
+            'EnumTag': 1 << 8,
+            'UnionTag': 1 << 9,
+            'StructTag': 1 << 10,
+            'ClassTag': 1 << 11,
+            'Namespace': 1 << 12,
+            'NestedNameSpecifier': 1 << 13,
+            'ObjCInterface': 1 << 14,
+            'ObjCProtocol': 1 << 15,
+            'ObjCCategory': 1 << 16,
+            'ObjCInstanceMessage': 1 << 17,
+            'ObjCClassMessage': 1 << 18,
+            'ObjCSelectorName': 1 << 19,
+            'MacroName': 1 << 20,
+            'NaturalLanguage': 1 << 21,
+            'Unknown': (1 << 22) - 1}
+
 class CodeCompletionResult(Structure):
     _fields_ = [('cursorKind', c_int), ('completionString', c_object_p)]
 
@@ -1776,6 +1821,39 @@ class CodeCompletionResult(Structure):
     def string(self):
         return CompletionString(self.completionString)
 
+class _CXTUResourceUsageEntry(Structure):
+    _fields_ = [('kind', c_int), ('amount', c_ulong)]
+
+class CXTUResourceUsage(Structure):
+    _fields_ = [('data', c_void_p),
+                ('numEntries', c_uint),
+                ('entries', POINTER(_CXTUResourceUsageEntry))]
+
+    def __len__(self):
+        return self.numEntries
+
+    def __getitem__(self, key):
+        if len(self) <= key:
+            raise IndexError
+
+        return self.entries[key]
+
+resourceUsageKinds = {
+            1: 'AST',
+            2: 'Identifiers',
+            3: 'Selectors',
+            4: 'GlobalCompletionResults',
+            5: 'SourceManagerContentCache',
+            6: 'AST_SideTables',
+            7: 'SourceManager_Membuffer_Malloc',
+            8: 'SourceManager_Membuffer_MMap',
+            9: 'ExternalASTSource_Membuffer_Malloc',
+            10: 'ExternalASTSource_Membuffer_MMap',
+            11: 'Preprocessor',
+            12: 'PreprocessingRecord',
+            13: 'SourceManager_DataStructures',
+            14: 'Preprocessor_HeaderSearch'}
+
 class CCRStructure(Structure):
     _fields_ = [('results', POINTER(CodeCompletionResult)),
                 ('numResults', c_int)]
@@ -1815,6 +1893,114 @@ class CodeCompletionResults(ClangObject):
         for i in range(len(ccr_struct)):
             yield ccr_struct[i]
 
+    @property
+    def contexts(self):
+        """
+        Bit mask of the CXCompletionContext values describing where
+        completion was invoked, see completionContexts.
+        """
+        return conf.lib.clang_codeCompleteGetContexts(self)
+
+    def summarize(self, accept=None):
+        """
+        Returns a (result index, typed text, priority) tuple for every result,
+        reading no chunk beyond the typed text. accept works as in extract.
+        """
+        lib = conf.lib
+
+        get_num_chunks = lib.clang_getNumCompletionChunks
+        get_chunk_kind = lib.clang_getCompletionChunkKind
+        get_chunk_text = lib.clang_getCompletionChunkText
+        get_priority = lib.clang_getCompletionPriority
+        get_availability = lib.clang_getCompletionAvailability
+
+        ccr_struct = self.ccr_struct
+        results = ccr_struct.results
+
+        summaries = []
+
+        for i in range(ccr_struct.numResults):
+            result = results[i]
+
+            string = result.completionString
+
+            if accept is not None and not accept(result.cursorKind, get_availability(string)):
+                continue
+
+            typed_text = ''
+
+            for key in range(get_num_chunks(string)):
+                if get_chunk_kind(string, key) == 1:
+                    typed_text = (get_chunk_text(string, key).spelling or b'').decode()
+
+                    break
+
+            summaries.append((i, typed_text, get_priority(string)))
+
+        return summaries
+
+    def extract(self, accept=None, indices=None):
+        """
+        Returns every result as a (chunks, priority, availability, cursor kind)
+        tuple of plain integers, where chunks is a tuple of (chunk kind, text)
+        pairs. Kinds are the integer keys of completionChunkKindMap,
+        availabilityKinds and CursorKind. Chunks with fixed text are not asked
+        for their text and Optional chunks carry an empty one.
+
+        If given, accept is called with the cursor kind and availability of
+        every result, and results it returns False for are skipped before any
+        of their chunks are read. indices restricts extraction to the results
+        at those indices, in that order.
+        """
+        lib = conf.lib
+
+        get_num_chunks = lib.clang_getNumCompletionChunks
+        get_chunk_kind = lib.clang_getCompletionChunkKind
+        get_chunk_text = lib.clang_getCompletionChunkText
+        get_priority = lib.clang_getCompletionPriority
+        get_availability = lib.clang_getCompletionAvailability
+
+        fixed_text = completionChunkFixedText
+
+        ccr_struct = self.ccr_struct
+        results = ccr_struct.results
+
+        if indices is None:
+            indices = range(ccr_struct.numResults)
+
+        extracted = []
+
+        for i in indices:
+            result = results[i]
+
+            string = result.completionString
+
+            availability = get_availability(string)
+
+            if accept is not None and not accept(result.cursorKind, availability):
+                continue
+
+            chunks = []
+
+            for key in range(get_num_chunks(string)):
+                kind = get_chunk_kind(string, key)
+
+                text = fixed_text.get(kind)
+
+                if text is None:
+                    text = (get_chunk_text(string, key).spelling or b'').decode()
+
+                chunks.append((kind, text))
+
+            extracted.append((
+                tuple(chunks),
+                get_priority(string),
+                availability,
+                result.cursorKind
+            ))
+
+        return extracted
+
     @property
     def diagnostics(self):
         class DiagnosticsItr:
@@ -1909,6 +2095,14 @@ class TranslationUnit(ClangObject):
     # into the set of code completions returned from this translation unit.
     PARSE_INCLUDE_BRIEF_COMMENTS_IN_CODE_COMPLETION = 128
 
+    @staticmethod
+    def default_editing_options():
+        """
+        Return the parse options libclang recommends for translation units
+        that will be reparsed and completed in as the user edits them.
+        """
+        return conf.lib.clang_defaultEditingTranslationUnitOptions()
+
     @classmethod
     def from_source(cls, filename, args=None, unsaved_files=None, options=0,
                     index=None):
@@ -2035,6 +2229,20 @@ class TranslationUnit(ClangObject):
         """Get the original translation unit source file name."""
         return conf.lib.clang_getTranslationUnitSpelling(self)
 
+    @property
+    def resource_usage(self):
+        """
+        Return a dict mapping the name of each memory category libclang tracks
+        for this translation unit to the number of bytes it currently uses.
+        """
+        usage = conf.lib.clang_getCXTUResourceUsage(self)
+
+        try:
+            return dict((resourceUsageKinds.get(entry.kind, str(entry.kind)),
+                         entry.amount) for entry in usage)
+        finally:
+            conf.lib.clang_disposeCXTUResourceUsage(usage)
+
     def get_includes(self):
         """
         Return an iterable sequence of FileInclusion objects that describe the
@@ -2182,7 +2390,7 @@ class TranslationUnit(ClangObject):
 
     def codeComplete(self, path, line, column, unsaved_files=None,
                      include_macros=False, include_code_patterns=False,
-                     include_brief_comments=False):
+                     include_brief_comments=False, skip_preamble=False):
         """
         Code complete in this translation unit.
 
@@ -2190,6 +2398,9 @@ class TranslationUnit(ClangObject):
         as unsaved_files, the first items should be the filenames to be mapped
         and the second should be the contents to be substituted for the
         file. The contents may be passed as strings or file objects.
+
+        With skip_preamble global scope declarations from the preamble are
+        left out of the results. Versions of libclang before 6.0 ignore it.
         """
         options = 0
 
@@ -2202,6 +2413,9 @@ class TranslationUnit(ClangObject):
         if include_brief_comments:
             options += 4
 
+        if skip_preamble:
+            options += 8
+
         if unsaved_files is None:
             unsaved_files = []
 
@@ -2408,6 +2622,42 @@ class CompilationDatabase(ClangObject):
     def getAllCompileCommands(self):
         return conf.lib.clang_CompilationDatabase_getAllCompileCommands(self)
 
+    def getAllCompileCommandTuples(self):
+        """
+        Return every compile command in the database as a (filename,
+        directory, arguments) tuple of str, with arguments being a tuple.
+
+        This walks the commands in a single pass without creating a
+        CompileCommand wrapper per command, which makes it considerably
+        faster than iterating getAllCompileCommands() for large databases.
+        """
+        lib = conf.lib
+
+        ccmds = lib.clang_CompilationDatabase_getAllCompileCommands(self)
+
+        if ccmds is None:
+            return []
+
+        get_command = lib.clang_CompileCommands_getCommand
+        get_filename = lib.clang_CompileCommand_getFilename
+        get_directory = lib.clang_CompileCommand_getDirectory
+        get_num_args = lib.clang_CompileCommand_getNumArgs
+        get_arg = lib.clang_CompileCommand_getArg
+
+        commands = []
+
+        for i in range(lib.clang_CompileCommands_getSize(ccmds.ccmds)):
+            cmd = get_command(ccmds.ccmds, i)
+
+            commands.append((
+                get_filename(cmd).decode(),
+                get_directory(cmd).decode(),
+                tuple([get_arg(cmd, j).decode()
+                       for j in range(get_num_args(cmd))])
+            ))
+
+        return commands
+
     def getCompileCommands(self, filename):
         """
         Get an iterable object providing all the CompileCommands available to
@@ -2513,6 +2763,11 @@ functionList = [
    _CXString,
    _CXString.from_result),
 
+  ("clang_CompileCommand_getFilename",
+   [c_object_p],
+   _CXString,
+   _CXString.from_result),
+
   ("clang_CompileCommand_getNumArgs",
    [c_object_p],
    c_uint),
@@ -2521,6 +2776,10 @@ functionList = [
    [TranslationUnit, c_char_p, c_int, c_int, c_void_p, c_int, c_int],
    POINTER(CCRStructure)),
 
+  ("clang_codeCompleteGetContexts",
+   [CodeCompletionResults],
+   c_ulonglong),
+
   ("clang_codeCompleteGetDiagnostic",
    [CodeCompletionResults, c_int],
    Diagnostic),
@@ -2545,6 +2804,10 @@ functionList = [
    [Cursor],
    bool),
 
+  ("clang_defaultEditingTranslationUnitOptions",
+   [],
+   c_uint),
+
   ("clang_defaultSaveOptions",
    [TranslationUnit],
    c_uint),
@@ -2555,8 +2818,8 @@ functionList = [
   ("clang_sortCodeCompletionResults",
    [POINTER(CodeCompletionResult), c_uint]),
 
-# ("clang_disposeCXTUResourceUsage",
-#  [CXTUResourceUsage]),
+  ("clang_disposeCXTUResourceUsage",
+   [CXTUResourceUsage]),
 
   ("clang_disposeDiagnostic",
    [Diagnostic]),
@@ -2697,9 +2960,9 @@ functionList = [
    _CXString,
    _CXString.from_result),
 
-# ("clang_getCXTUResourceUsage",
-#  [TranslationUnit],
-#  CXTUResourceUsage),
+  ("clang_getCXTUResourceUsage",
+   [TranslationUnit],
+   CXTUResourceUsage),
 
   ("clang_getCXXAccessSpecifier",
    [Cursor],
@@ -1,4 +1,5 @@
 from functools import partial
+import os.path
 import re
 
 import sublime
@@ -6,7 +7,15 @@ import sublime_plugin
 
 from .clang import cindex
 
+from .completion.asynchronous import CompletionQueue
+from .completion.cache import CompletionCache
+from .completion.documentation import DocumentationCache, format_documentation
+from .index.database import TranslationUnitDatabase
+from .index.remote import RemoteDatabase, WorkerError
+from .index.scheduler import Scheduler
+from .index.stats import format_report
 from .utils.settings import Settings
+from .utils.snapshots import BufferSnapshots
 
 xcode_path_hints = (
     '/Applications/Xcode.app/Contents/Developer/Toolchains/XcodeDefault.xctoolchain/usr/lib',  # XCode >= 5
@@ -40,6 +49,9 @@ supported_c_languages = (
     'objc'
 )
 
+# Typing one of these is almost always followed by a completion request
+member_access_triggers = ('.', '->', '::')
+
 def is_c_language(view):
     caret = view.sel()[0].a
 
@@ -55,49 +67,189 @@ def is_c_language(view):
     return is_supported
 
 
-class TranslationUnitDatabase(object):
+class IndexCache(object):
+    """
+    Keeps one TranslationUnitDatabase per build directory, shared by every
+    window using that build directory. A database is closed once the last
+    window using it detaches.
 
-    compilation_database = None
+    Build directories a window failed to open a database for are remembered,
+    so they are not retried on every activation.
+    """
 
-    index = None
+    databases = None
 
-    translation_units = None
+    windows = None
 
-    def __init__(self, build_directory):
-        self.compilation_database = cindex.CompilationDatabase.fromDirectory(
-            build_directory.encode()
-        )
+    references = None
 
-        commands = self.compilation_database.getAllCompileCommands()
+    failures = None
 
-        self.index = cindex.Index.create()
+    def __init__(self):
+        self.databases = {}
+        self.windows = {}
+        self.references = {}
+        self.failures = {}
 
-        self.translation_units = {}
+    @staticmethod
+    def canonical(build_directory):
+        return os.path.normcase(os.path.realpath(build_directory))
 
-        for command in commands.commands:
-            translation_unit = self.index.parse(None, list(command.arguments))
+    def __getitem__(self, item):
+        if item is None:
+            return None
 
-            file_name = translation_unit.spelling.decode()
+        return self.database_of(item.window_id)
 
-            self.translation_units[file_name] = translation_unit
+    def database_of(self, window_id):
+        build_directory = self.windows.get(window_id, None)
 
+        return self.databases.get(build_directory, None)
 
-class IndexCache(object):
+    def closed_windows(self):
+        """Returns the ids of attached windows that are no longer open."""
 
-    databases = None
+        open_windows = set(window.window_id for window in sublime.windows())
 
-    def __init__(self):
-        self.databases = {}
+        known_windows = set(self.windows) | set(self.failures)
 
-    def __getitem__(self, item):
-        return self.databases.get(item.window_id, None)
+        return [window_id for window_id in known_windows if window_id not in open_windows]
+
+    def find(self, build_directory):
+        return self.databases.get(self.canonical(build_directory), None)
+
+    def attach(self, window, database):
+        build_directory = self.canonical(database.build_directory)
+
+        self.databases[build_directory] = database
+
+        self.windows[window.window_id] = build_directory
+
+        self.references.setdefault(build_directory, set()).add(window.window_id)
+
+    def detach(self, window):
+        self.release(window.window_id)
+
+    def release(self, window_id):
+        self.failures.pop(window_id, None)
+
+        build_directory = self.windows.pop(window_id, None)
+
+        if build_directory is None:
+            return
+
+        references = self.references.get(build_directory, set())
 
-    def __setitem__(self, key, value):
-        self.databases[key.window_id] = value
+        references.discard(window_id)
+
+        if not references:
+            self.references.pop(build_directory, None)
+
+            self.databases.pop(build_directory).close()
 
 
 index_cache = IndexCache()
 
+completion_queue = CompletionQueue()
+
+completion_cache = CompletionCache()
+
+documentation_cache = DocumentationCache()
+
+buffer_snapshots = BufferSnapshots()
+
+
+def create_database(window, retry=False):
+    """
+    Opens or shares the database for the window's build directory. A build
+    directory that failed before is only tried again with retry.
+    """
+
+    settings = Settings(window)
+
+    if not settings.build_cache:
+        return None
+
+    if not retry and index_cache.failures.get(window.window_id) == settings.build_cache:
+        return None
+
+    database = index_cache.find(settings.build_cache)
+
+    if database is not None:
+        index_cache.attach(window, database)
+
+        prioritize(database, window)
+
+        return database
+
+    options = {
+        'workers': settings.index_workers,
+        'lazy': settings.lazy_index,
+        'memory_budget': settings.index_memory_budget,
+        'ast_cache': settings.ast_cache,
+        'parse_profiles': settings.parse_profiles,
+        'brief_comments': settings.completion_documentation
+    }
+
+    try:
+        if settings.out_of_process:
+            database = RemoteDatabase(
+                settings.build_cache,
+                processes=settings.worker_processes,
+                python=settings.worker_python,
+                **options
+            )
+        else:
+            database = TranslationUnitDatabase(settings.build_cache, **options)
+    except cindex.CompilationDatabaseError:
+        index_cache.failures[window.window_id] = settings.build_cache
+
+        return None
+    except WorkerError as e:
+        print('Failed to start index worker: %s' % e)
+
+        index_cache.failures[window.window_id] = settings.build_cache
+
+        return None
+
+    index_cache.failures.pop(window.window_id, None)
+
+    database.on_progress = sublime.status_message
+
+    index_cache.attach(window, database)
+
+    database.index_project()
+
+    prioritize(database, window)
+
+    return database
+
+
+def release_window(window_id):
+    """Cancels the jobs of a closed window and detaches it from its database."""
+
+    database = index_cache.database_of(window_id)
+
+    if database is not None:
+        database.cancel(window_id)
+
+    index_cache.release(window_id)
+
+
+def release_closed_windows():
+    for window_id in index_cache.closed_windows():
+        release_window(window_id)
+
+
+def prioritize(database, window):
+    active_view = window.active_view()
+
+    database.prioritize(
+        active_view.file_name() if active_view else None,
+        [view.file_name() for view in window.views() if view.file_name()],
+        window.window_id
+    )
+
 
 def plugin_loaded():
     if has_clang:
@@ -109,101 +261,466 @@ def plugin_loaded():
         sublime.status_message('Failed to load libclang')
 
     for window in sublime.windows():
-        settings = Settings(window)
+        create_database(window)
+
+
+class ClangRefreshIndex(sublime_plugin.WindowCommand):
+
+    def run(self):
+        database = index_cache[self.window]
+
+        if database is None:
+            sublime.set_timeout_async(partial(create_database, self.window, True), 0)
+        else:
+            sublime.set_timeout_async(database.refresh, 0)
+
+
+class ClangIndexingReport(sublime_plugin.WindowCommand):
 
-        if settings.build_cache:
-            index_cache[window] = TranslationUnitDatabase(settings.build_cache)
+    def is_enabled(self, export=False):
+        return index_cache[self.window] is not None
+
+    def run(self, export=False):
+        database = index_cache[self.window]
+
+        report = database.report()
+
+        if export:
+            report_file = os.path.join(
+                database.build_directory,
+                'indexing_report.json'
+            )
+
+            with open(report_file, 'w') as report_json:
+                report_json.write(sublime.encode_value(report, True))
+
+            self.window.open_file(report_file)
+        else:
+            view = self.window.new_file()
+
+            view.set_name('Indexing report')
+            view.set_scratch(True)
+
+            view.run_command('append', {
+                'characters': format_report(report)
+            })
+
+            view.set_read_only(True)
 
 
 class ClangCompletion(sublime_plugin.EventListener):
 
-    return_types = {
-        cindex.CursorKind.UNION_DECL: 'union',
-        cindex.CursorKind.CLASS_DECL: 'class',
-        cindex.CursorKind.ENUM_DECL: 'enum',
-        cindex.CursorKind.STRUCT_DECL: 'struct',
-        cindex.CursorKind.MACRO_DEFINITION: 'macro',
-        cindex.CursorKind.NAMESPACE: 'namespace',
-        cindex.CursorKind.TYPEDEF_DECL: 'typedef',
-        cindex.CursorKind.CONSTRUCTOR: 'constructor'
-    }
+    # Seconds to wait for a speculative completion of the requested location
+    speculation_timeout = 5
+
+    # Commands inserting the completion selected in the popup
+    commit_commands = ('commit_completion', 'insert_best_completion')
 
-    def parse_completion_result(self, completion_result: cindex.CodeCompletionResult):
-        completion_string = completion_result.string
+    awaiting = None
 
-        return_type = None
+    starts = None
 
-        insertion = ''
-        representation = ''
-        start = False
-        placeholder_count = 0
+    def __init__(self):
+        # Views whose completion popup waits for a speculative request
+        self.awaiting = {}
+
+        # Where the last completion of each view started
+        self.starts = {}
 
-        for chunk_index in range(completion_string.num_chunks):
-            chunk = completion_string[chunk_index]
+    @staticmethod
+    def unsaved_files(view, file_name):
+        unsaved_files = []
 
-            assert isinstance(chunk, cindex.CompletionChunk)
+        if view.is_dirty():
+            unsaved_files.append((file_name, buffer_snapshots.get(view)))
 
-            chunk_kind = str(chunk.kind)
+        return unsaved_files
 
-            chunk_string = chunk.spelling.decode()
+    @staticmethod
+    def translation_unit_source(view):
+        """
+        Returns the database and the source file whose translation unit serves
+        the view, or (None, None) if the view is not part of any.
+        """
 
-            if not chunk_string:
-                chunk_string = ""
+        database = index_cache[view.window()]
 
-            if chunk_kind == 'TypedText':
-                start = True
+        if database is None or view.file_name() is None:
+            return None, None
 
-            if chunk_kind == 'ResultType':
-                return_type = chunk_string
-            else:
-                representation += chunk_string
+        return database, database.resolve(view.file_name())
 
-            if start and (chunk_kind != 'Informative'):
-                if chunk_kind == 'Placeholder':
-                    insertion += '${%d:%s}' % (placeholder_count, chunk_string)
-                else:
-                    insertion += chunk_string
+    def on_modified(self, view):
+        selection = view.sel()
 
-        if not return_type:
-            return_type = self.return_types.get(completion_result.kind, None)
+        if len(selection):
+            completion_cache.modified(
+                view.id(),
+                min(region.begin() for region in selection)
+            )
 
-        if return_type:
-            representation += "\t%s" % return_type
+    def on_modified_async(self, view):
+        database, source = self.translation_unit_source(view)
 
-        return representation, insertion, completion_string.priority
+        if source is None:
+            return
+
+        # Encode the new buffer state off the UI thread, so completing in it
+        # finds the snapshot ready.
+        buffer_snapshots.get(view)
+
+        settings = Settings(view.window())
+
+        if settings.speculative_completion:
+            self.complete_speculatively(view, database)
+
+        sublime.set_timeout_async(
+            partial(self.reparse, view, view.change_count()),
+            settings.reparse_delay
+        )
+
+    def complete_speculatively(self, view, database):
+        """
+        Starts completing right after a member access was typed, before the
+        completion popup asks for it.
+        """
+
+        caret = view.sel()[0].b
+
+        if self.is_global_scope(view, caret):
+            return
+
+        key = self.completion_key(view, caret)
+
+        request = (caret, view.change_count())
+
+        if key in completion_cache or completion_queue.is_pending(view.id(), request):
+            return
+
+        line, column = view.rowcol(caret)
+
+        completion_queue.submit(
+            view.id(),
+            request,
+            partial(
+                self.complete,
+                database,
+                view.file_name(),
+                line + 1,
+                column + 1,
+                self.unsaved_files(view, view.file_name().encode()),
+                key
+            ),
+            partial(self.speculation_ready, view, request)
+        )
+
+    def reparse(self, view, change_count):
+        # Only the last modification within the delay triggers a reparse
+        if view.change_count() != change_count:
+            return
+
+        database, source = self.translation_unit_source(view)
+
+        if source is not None:
+            file_name = view.file_name()
+
+            # Reparsing may parse the unit first, which would hold up every
+            # other event handler on Sublime's async thread.
+            database.schedule_reparse(
+                source,
+                self.unsaved_files(view, file_name.encode()),
+                (file_name, change_count)
+            )
+
+    def on_activated_async(self, view):
+        window = view.window()
+
+        if window is not None and index_cache[window] is None:
+            create_database(window)
+
+        database, source = self.translation_unit_source(view)
+
+        if source is not None:
+            database.schedule(
+                source,
+                Scheduler.ACTIVE,
+                view.window().window_id,
+                profile='editing'
+            )
+
+    def on_pre_close_window(self, window):
+        # Sublime Text 4 only, Sublime Text 3 is handled by on_close
+        release_window(window.window_id)
+
+    def on_close(self, view):
+        # Sublime Text 3 has no window events, closing a window closes its
+        # views first, so look for windows that are gone once it is closed.
+        sublime.set_timeout_async(release_closed_windows, 500)
+
+        completion_queue.discard(view.id())
+
+        buffer_snapshots.discard(view.id())
+
+        completion_cache.forget(view.id())
+
+        self.awaiting.pop(view.id(), None)
+
+        self.starts.pop(view.id(), None)
+
+        if view.file_name() is not None:
+            completion_cache.discard(view.file_name())
+
+            documentation_cache.discard(view.file_name())
+
+    @staticmethod
+    def is_global_scope(view, start):
+        """True unless completion starts right after a member access."""
+
+        preceding = view.substr(sublime.Region(max(start - 2, 0), start))
+
+        return not preceding.endswith(member_access_triggers)
+
+    @staticmethod
+    def completion_key(view, start):
+        return completion_cache.key(view.file_name(), view.id(), start)
+
+    @staticmethod
+    def cached_completions(key, prefix, limit):
+        """
+        Returns the cached completions ranked for prefix, or None. Sublime
+        Text 4 only filters the items it was given while the user keeps
+        typing, so it is asked to query again if they were cut off at limit.
+        """
+
+        completions = completion_cache.get(key, prefix, limit)
+
+        if completions is not None and limit is not None and len(completions) >= limit \
+                and hasattr(sublime, 'DYNAMIC_COMPLETIONS'):
+            return completions, sublime.DYNAMIC_COMPLETIONS
+
+        return completions
 
     def on_query_completions(self, view, prefix, locations):
         database = index_cache[view.window()]
 
-        tu = database.translation_units.get(view.file_name())
+        if database is None or view.file_name() is None:
+            return None
 
-        assert isinstance(tu, cindex.TranslationUnit)
+        start = locations[0] - len(prefix)
 
-        line, column = view.rowcol(locations[0] - len(prefix))
+        self.starts[view.id()] = start
 
-        unsaved_files = []
+        key = self.completion_key(view, start)
 
-        if view.is_dirty():
-            unsaved_files.append(
-                (
-                    tu.spelling,
-                    view.substr(sublime.Region(0, view.size())).encode()
-                )
+        settings = Settings(view.window())
+
+        limit = settings.max_completions or None
+
+        completions = self.cached_completions(key, prefix, limit)
+
+        if completions is not None:
+            return completions
+
+        if settings.async_completion:
+            return self.query_completions_async(view, database, start, key, prefix, limit)
+
+        request = (start, view.change_count())
+
+        # Completing the same location again would only queue up behind the
+        # speculative request on the translation unit.
+        if completion_queue.is_pending(view.id(), request):
+            completion_queue.wait(view.id(), request, self.speculation_timeout)
+
+            completions = self.cached_completions(key, prefix, limit)
+
+            if completions is not None:
+                return completions
+
+        line, column = view.rowcol(start)
+
+        completions = self.complete(
+            database,
+            view.file_name(),
+            line + 1,
+            column + 1,
+            self.unsaved_files(view, view.file_name().encode()),
+            key,
+            self.is_global_scope(view, start)
+        )
+
+        if completions is None:
+            return None
+
+        return self.cached_completions(key, prefix, limit)
+
+    def query_completions_async(self, view, database, start, key, prefix, limit):
+        """
+        Answers from finished results for this location and buffer state, or
+        starts completing in the background and re-opens the completion popup
+        once the results arrive.
+        """
+
+        request = (start, view.change_count())
+
+        completions = completion_queue.take(view.id(), request)
+
+        if completions is not None:
+            return self.cached_completions(key, prefix, limit)
+
+        if completion_queue.is_pending(view.id(), request):
+            self.awaiting[view.id()] = request
+
+            # The request may have finished before it was marked as awaited,
+            # in which case speculation_ready has not re-opened the popup.
+            if completion_queue.take(view.id(), request) is not None:
+                if self.awaiting.get(view.id()) == request:
+                    self.awaiting.pop(view.id(), None)
+
+                return self.cached_completions(key, prefix, limit)
+        else:
+            line, column = view.rowcol(start)
+
+            completion_queue.submit(
+                view.id(),
+                request,
+                partial(
+                    self.complete,
+                    database,
+                    view.file_name(),
+                    line + 1,
+                    column + 1,
+                    self.unsaved_files(view, view.file_name().encode()),
+                    key,
+                    self.is_global_scope(view, start)
+                ),
+                partial(self.completions_ready, view, request)
             )
 
-        completions = tu.codeComplete(
-            tu.spelling,
+        return []
+
+    @staticmethod
+    def complete(database, file_name, line, column, unsaved_files, key=None,
+                 global_scope=False):
+        source = database.resolve(file_name)
+
+        if source is None:
+            return None
+
+        completions = database.complete(
+            source,
+            file_name.encode(),
+            line,
+            column,
+            unsaved_files,
+            global_scope
+        )
+
+        if completions is not None and key is not None:
+            completion_cache.put(key, completions)
+
+        return completions
+
+    def on_post_text_command(self, view, command_name, args):
+        if command_name not in self.commit_commands or not hasattr(view, 'show_popup'):
+            return
+
+        database = index_cache[view.window()]
+
+        start = self.starts.get(view.id())
+
+        if database is None or start is None or view.file_name() is None:
+            return
+
+        if not Settings(view.window()).completion_documentation:
+            return
+
+        line = view.line(start)
+
+        completion = completion_cache.find(
+            self.completion_key(view, start),
+            view.substr(sublime.Region(start, line.end()))
+        )
+
+        if completion is None:
+            return
+
+        representation = completion[1]
+
+        comment = documentation_cache.get(view.file_name(), representation)
+
+        if comment is None:
+            sublime.set_timeout_async(
+                partial(self.fetch_documentation, view, database, start, completion),
+                0
+            )
+        else:
+            self.show_documentation(view, start, representation, comment)
+
+    def fetch_documentation(self, view, database, start, completion):
+        typed_text, representation = completion
+
+        file_name = view.file_name()
+
+        source = database.resolve(file_name)
+
+        if source is None:
+            return
+
+        change_count = view.change_count()
+
+        line, column = view.rowcol(start)
+
+        comment = database.documentation(
+            source,
+            file_name.encode(),
             line + 1,
             column + 1,
-            unsaved_files
+            typed_text,
+            representation,
+            self.unsaved_files(view, file_name.encode())
         )
 
-        completions.sort()
+        if comment is None:
+            return
+
+        documentation_cache.put(file_name, representation, comment)
+
+        # Only document the completion while the user has not moved on
+        if view.change_count() == change_count:
+            sublime.set_timeout(
+                partial(self.show_documentation, view, start, representation, comment),
+                0
+            )
+
+    @staticmethod
+    def show_documentation(view, start, representation, comment):
+        if comment:
+            view.show_popup(
+                format_documentation(representation, comment),
+                sublime.HIDE_ON_MOUSE_MOVE_AWAY,
+                start,
+                600
+            )
+
+    def speculation_ready(self, view, request, completions):
+        # Only show the results if the popup was opened while they were pending
+        if self.awaiting.get(view.id()) == request:
+            self.awaiting.pop(view.id(), None)
+
+            self.completions_ready(view, request, completions)
+
+    @staticmethod
+    def completions_ready(view, request, completions):
+        if not completions or view.change_count() != request[1]:
+            return
 
-        comp = []
-        for result in completions.results:
-            comp.append(self.parse_completion_result(result))
+        def show_completions():
+            view.run_command('hide_auto_complete')
 
-        comp = sorted(comp, key=lambda a: a[2])
+            view.run_command('auto_complete', {
+                'disable_auto_insert': True,
+                'api_completions_only': True,
+                'next_completion_if_showing': False
+            })
 
-        return [a[:2] for a in comp]
+        sublime.set_timeout(show_completions, 0)
@@ -161,6 +161,8 @@ class CmakeUpdateBuildCache(WindowCommandSettingsMixin, sublime_plugin.WindowCom
 
                 self.update_watched_dependencies(build_cache_path)
 
+                self.window.run_command('clang_refresh_index')
+
                 sublime.status_message('Finished refreshing CMake build cache')
 
         sublime.set_timeout_async(_async, 0)
@@ -0,0 +1,123 @@
+import threading
+import traceback
+
+
+class CompletionQueue(object):
+    """
+    Runs completion requests on a background thread so the editor never
+    waits on libclang.
+
+    Each view has at most one queued request, submitting another one for the
+    same view replaces a request that has not started yet. Results of a
+    request that was superseded while it ran are discarded.
+    """
+
+    queued = None
+
+    results = None
+
+    latest = None
+
+    condition = None
+
+    def __init__(self):
+        self.queued = {}
+        self.results = {}
+        self.latest = {}
+        self.condition = threading.Condition()
+
+        threading.Thread(target=self.work, daemon=True).start()
+
+    def submit(self, view_id, request, function, callback):
+        """
+        Queues function for view_id. Once it returns, callback is called with
+        the completions unless another request for the view was submitted in
+        the meantime. request identifies the completion location and buffer
+        state, and is used to look the results up with take().
+        """
+
+        with self.condition:
+            self.latest[view_id] = request
+            self.queued[view_id] = (request, function, callback)
+
+            self.condition.notify()
+
+    def take(self, view_id, request):
+        """Returns the finished completions for request, or None."""
+
+        with self.condition:
+            result = self.results.get(view_id)
+
+        if result is not None and result[0] == request:
+            return result[1]
+
+        return None
+
+    def is_pending(self, view_id, request):
+        """True if request was submitted and has not finished yet."""
+
+        with self.condition:
+            result = self.results.get(view_id, (None, None))
+
+            return self.latest.get(view_id) == request and result[0] != request
+
+    def wait(self, view_id, request, timeout):
+        """
+        Waits up to timeout seconds for a pending request to finish and
+        returns its completions, or None if it failed, was superseded or did
+        not finish in time.
+        """
+
+        def finished():
+            result = self.results.get(view_id, (None, None))
+
+            return result[0] == request or self.latest.get(view_id) != request
+
+        with self.condition:
+            self.condition.wait_for(finished, timeout)
+
+        return self.take(view_id, request)
+
+    def discard(self, view_id):
+        with self.condition:
+            self.queued.pop(view_id, None)
+            self.results.pop(view_id, None)
+            self.latest.pop(view_id, None)
+
+    def next_request(self):
+        with self.condition:
+            while not self.queued:
+                self.condition.wait()
+
+            view_id = next(iter(self.queued))
+
+            self.results.pop(view_id, None)
+
+            return (view_id,) + self.queued.pop(view_id)
+
+    def work(self):
+        while True:
+            view_id, request, function, callback = self.next_request()
+
+            try:
+                completions = function()
+            except Exception:
+                traceback.print_exc()
+
+                with self.condition:
+                    if self.latest.get(view_id) == request:
+                        self.latest.pop(view_id)
+
+                    self.condition.notify_all()
+
+                continue
+
+            with self.condition:
+                if self.latest.get(view_id) != request:
+                    continue
+
+                self.results[view_id] = (request, completions)
+
+                self.condition.notify_all()
+
+            callback(completions)
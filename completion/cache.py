@@ -0,0 +1,106 @@
+import itertools
+import threading
+
+from .ranking import CandidateTable
+from .results import LazyCompletions
+
+
+class CompletionCache(object):
+    """
+    Remembers the last completion results of each file along with where
+    completion started and a generation of the buffer before that position.
+    While the user keeps typing the same identifier neither changes, so
+    further keystrokes are answered by ranking the cached results against
+    the typed prefix instead of asking libclang again.
+
+    Each view has an anchor, the start of its last completion and the
+    generation of the text before it. Any modification before the anchor
+    drops it, so the next key for that start gets a new generation, without
+    ever reading the buffer.
+    """
+
+    entries = None
+
+    anchors = None
+
+    generations = None
+
+    lock = None
+
+    def __init__(self):
+        self.entries = {}
+        self.anchors = {}
+        self.generations = itertools.count()
+        self.lock = threading.Lock()
+
+    def key(self, file_name, view_id, start):
+        with self.lock:
+            anchor = self.anchors.get(view_id)
+
+            if anchor is None or anchor[0] != start:
+                anchor = self.anchors[view_id] = (start, next(self.generations))
+
+        return file_name, start, anchor[1]
+
+    def modified(self, view_id, position):
+        """
+        Tells that view_id was modified with its leftmost caret at position,
+        edits end with the caret after any text they changed.
+        """
+
+        with self.lock:
+            anchor = self.anchors.get(view_id)
+
+            if anchor is not None and position < anchor[0]:
+                del self.anchors[view_id]
+
+    def forget(self, view_id):
+        with self.lock:
+            self.anchors.pop(view_id, None)
+
+    def __contains__(self, key):
+        with self.lock:
+            entry = self.entries.get(key[0])
+
+        return entry is not None and entry[0] == key
+
+    def get(self, key, prefix, limit=None):
+        """
+        Returns at most limit of the cached completions for key ranked by
+        prefix, or None.
+        """
+
+        with self.lock:
+            entry = self.entries.get(key[0])
+
+        if entry is None or entry[0] != key:
+            return None
+
+        return entry[1].rank(prefix, limit)
+
+    def find(self, key, text):
+        """
+        Returns the (typed text, representation) of the cached completion for
+        key inserted at the start of text, or None.
+        """
+
+        with self.lock:
+            entry = self.entries.get(key[0])
+
+        if entry is None or entry[0] != key:
+            return None
+
+        return entry[1].find(text)
+
+    def put(self, key, completions):
+        if isinstance(completions, LazyCompletions):
+            table = CandidateTable(completions.candidates, completions.materialize)
+        else:
+            table = CandidateTable(completions or [])
+
+        with self.lock:
+            self.entries[key[0]] = (key, table)
+
+    def discard(self, file_name):
+        with self.lock:
+            self.entries.pop(file_name, None)
@@ -0,0 +1,70 @@
+import html
+import threading
+
+from .results import parse_completion_result
+
+
+def find_brief_comment(completions, typed_text, representation):
+    """
+    Returns the brief comment of the result in CodeCompletionResults
+    completions with typed_text and representation, so overloads sharing a
+    typed text are told apart. Only results whose typed text matches are
+    extracted in full.
+    """
+
+    indices = [index for index, text, _ in completions.summarize() if text == typed_text]
+
+    results = completions.ccr_struct.results
+
+    for index, result in zip(indices, completions.extract(indices=indices)):
+        if parse_completion_result(result)[0] != representation:
+            continue
+
+        comment = results[index].string.briefComment.spelling
+
+        if comment:
+            return comment.decode()
+
+    return ''
+
+
+def format_documentation(representation, comment):
+    """Returns the popup content documenting a completion item."""
+
+    signature, _, result_type = representation.partition('\t')
+
+    return '<b>%s</b> <i>%s</i><br>%s' % (
+        html.escape(signature),
+        html.escape(result_type),
+        html.escape(comment)
+    )
+
+
+class DocumentationCache(object):
+    """
+    Memoizes the brief comments fetched for completion items of each file,
+    keyed by their representation, which holds the signature and result type
+    and so differs between overloads.
+    """
+
+    comments = None
+
+    lock = None
+
+    def __init__(self):
+        self.comments = {}
+        self.lock = threading.Lock()
+
+    def get(self, file_name, representation):
+        """Returns the memoized comment, '' if there is none, or None if unknown."""
+
+        with self.lock:
+            return self.comments.get(file_name, {}).get(representation)
+
+    def put(self, file_name, representation, comment):
+        with self.lock:
+            self.comments.setdefault(file_name, {})[representation] = comment
+
+    def discard(self, file_name):
+        with self.lock:
+            self.comments.pop(file_name, None)
@@ -0,0 +1,67 @@
+import threading
+
+from .results import parse_completion_result, usable_availabilities
+
+
+def is_usable(cursor_kind, availability):
+    return availability in usable_availabilities
+
+
+def tag_completions(completions):
+    """
+    Converts CodeCompletionResults into (cursor kind, availability, item)
+    tuples, where item is a completion as returned by build_completions, so
+    they can be filtered for another completion context later.
+    """
+
+    return [
+        (result[3], result[2], parse_completion_result(result))
+        for result in completions.extract(is_usable)
+    ]
+
+
+class GlobalCompletionCache(object):
+    """
+    Remembers the global scope completion items each translation unit's
+    preamble contributes, mostly declarations from system headers. They only
+    change along with the preamble, so each entry is stamped with the compile
+    arguments and included headers the preamble was built from.
+
+    Which items libclang offers depends on the completion contexts, so the
+    items are kept per contexts bitmask under the stamp.
+    """
+
+    entries = None
+
+    lock = None
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, file_name, stamp, contexts):
+        """
+        Returns the cached items of file_name built from stamp for contexts,
+        or None.
+        """
+
+        with self.lock:
+            entry = self.entries.get(file_name)
+
+        if entry is None or entry[0] != stamp:
+            return None
+
+        return entry[1].get(contexts)
+
+    def put(self, file_name, stamp, contexts, items):
+        with self.lock:
+            entry = self.entries.get(file_name)
+
+            if entry is None or entry[0] != stamp:
+                entry = self.entries[file_name] = (stamp, {})
+
+            entry[1][contexts] = items
+
+    def discard(self, file_name):
+        with self.lock:
+            self.entries.pop(file_name, None)
@@ -0,0 +1,246 @@
+from array import array
+import heapq
+
+# Score weights, a matched character is worth one point plus the bonuses that
+# apply to it. Match quality always outweighs clang's priority, which is
+# only used to order candidates matching equally well.
+boundary_bonus = 8
+consecutive_bonus = 4
+prefix_bonus = 20
+case_bonus = 5
+priority_scale = 1000
+
+
+def is_subsequence(query, text, start=0):
+    """True if the characters of query appear in order in text from start."""
+
+    for character in query:
+        start = text.find(character, start)
+
+        if start < 0:
+            return False
+
+        start += 1
+
+    return True
+
+
+def word_boundaries(text):
+    """
+    Returns a string as long as text holding the lowered character at every
+    position starting a word, at the start of the text, after an underscore,
+    around digit runs and at camelCase humps, and NUL everywhere else.
+    """
+
+    boundaries = []
+    previous = ''
+
+    for index, character in enumerate(text):
+        following = text[index + 1:index + 2]
+
+        if not previous or previous == '_' \
+                or (character.isupper() and not previous.isupper()) \
+                or (character.isupper() and following.islower()) \
+                or (character.isdigit() != previous.isdigit()):
+            boundaries.append(character.lower())
+        else:
+            boundaries.append('\0')
+
+        previous = character
+
+    return ''.join(boundaries)
+
+
+class CandidateTable(object):
+    """
+    Column oriented table of completion candidates built once per result set.
+    Each column is a flat list or array indexed by candidate, typed texts are
+    stored lowered and word boundaries are computed once per candidate the
+    first time a fuzzy match needs them, so ranking a query mostly runs string
+    searches implemented in C.
+
+    Candidates are (representation, insertion, typed text, priority) tuples.
+    Representation and insertion may be None if materialize is given, which
+    is called with the indices of such candidates once they are selected and
+    returns their (representation, insertion) items.
+    """
+
+    items = None
+
+    materialize = None
+
+    typed = None
+
+    lowered = None
+
+    boundaries = None
+
+    priorities = None
+
+    last_query = None
+
+    last_matches = None
+
+    def __init__(self, candidates, materialize=None):
+        self.items = [
+            (candidate[0], candidate[1]) if candidate[0] is not None else None
+            for candidate in candidates
+        ]
+        self.materialize = materialize
+        self.typed = [candidate[2] for candidate in candidates]
+        self.lowered = [typed.lower() for typed in self.typed]
+        self.boundaries = [None] * len(self.typed)
+        self.priorities = array('i', [candidate[3] for candidate in candidates])
+
+    def __len__(self):
+        return len(self.items)
+
+    def select(self, indices):
+        """Returns the items of the candidates at indices, building missing ones."""
+
+        missing = [index for index in indices if self.items[index] is None]
+
+        if missing:
+            for index, item in zip(missing, self.materialize(missing)):
+                self.items[index] = item
+
+        return [self.items[index] for index in indices]
+
+    def score(self, index, query, lowered_query):
+        """
+        Scores a fuzzy match of query against candidate index, or returns None
+        if the query is not a subsequence of its typed text.
+        """
+
+        lowered = self.lowered[index]
+
+        if lowered.startswith(lowered_query):
+            score = (1 + consecutive_bonus) * len(query) + prefix_bonus
+
+            if self.typed[index].startswith(query):
+                score += case_bonus
+
+            return score
+
+        boundaries = self.boundaries[index]
+
+        if boundaries is None:
+            boundaries = self.boundaries[index] = word_boundaries(self.typed[index])
+
+        score = 0
+        position = 0
+        previous = -2
+
+        for query_index, character in enumerate(lowered_query):
+            found = lowered.find(character, position)
+
+            if found < 0:
+                return None
+
+            if found != previous + 1 and boundaries[found] == '\0':
+                # Prefer jumping to the next word starting with the character,
+                # unless the rest of the query no longer matches after it.
+                boundary = boundaries.find(character, found)
+
+                if boundary >= 0 and is_subsequence(
+                        lowered_query[query_index + 1:], lowered, boundary + 1):
+                    found = boundary
+
+            score += 1
+
+            if boundaries[found] != '\0':
+                score += boundary_bonus
+
+            if found == previous + 1:
+                score += consecutive_bonus
+
+            previous = found
+            position = found + 1
+
+        return score
+
+    def matches(self, lowered_query):
+        """
+        Returns the candidates that may match lowered_query. Every match of a
+        query also matched any prefix of it, so while the user keeps typing
+        only the previous matches need to be scored again.
+        """
+
+        if self.last_query is not None and lowered_query.startswith(self.last_query):
+            return self.last_matches
+
+        return range(len(self.items))
+
+    def find(self, text):
+        """
+        Returns the (typed text, representation) of the candidate inserted at
+        the start of text, the one with the longest typed text text starts
+        with and the best priority among those, or None.
+        """
+
+        best = None
+
+        for index, typed in enumerate(self.typed):
+            if not typed or not text.startswith(typed):
+                continue
+
+            rank = (-len(typed), self.priorities[index])
+
+            if best is None or rank < best[0]:
+                best = (rank, index)
+
+        if best is None:
+            return None
+
+        return self.typed[best[1]], self.select([best[1]])[0][0]
+
+    def rank(self, query, limit=None):
+        """
+        Returns the (representation, insertion) items matching query, best
+        first. With a limit only the best limit items are selected, using a
+        heap instead of sorting every match. The table keeps all candidates,
+        so a longer query selects again from the full set.
+        """
+
+        if not query:
+            if limit is None:
+                order = sorted(range(len(self.items)), key=self.priorities.__getitem__)
+            else:
+                order = heapq.nsmallest(
+                    limit,
+                    range(len(self.items)),
+                    key=self.priorities.__getitem__
+                )
+
+            return self.select(order)
+
+        lowered_query = query.lower()
+
+        first = lowered_query[0]
+
+        scored = []
+        matched = array('i')
+
+        for index in self.matches(lowered_query):
+            if first not in self.lowered[index]:
+                continue
+
+            score = self.score(index, query, lowered_query)
+
+            if score is not None:
+                matched.append(index)
+
+                scored.append((
+                    self.priorities[index] - score * priority_scale,
+                    index
+                ))
+
+        self.last_query = lowered_query
+        self.last_matches = matched
+
+        if limit is None:
+            scored.sort()
+        else:
+            scored = heapq.nsmallest(limit, scored)
+
+        return self.select([index for _, index in scored])
@@ -0,0 +1,182 @@
+import threading
+
+from ..clang import cindex
+
+return_types = {
+    cindex.CursorKind.UNION_DECL.value: 'union',
+    cindex.CursorKind.CLASS_DECL.value: 'class',
+    cindex.CursorKind.ENUM_DECL.value: 'enum',
+    cindex.CursorKind.STRUCT_DECL.value: 'struct',
+    cindex.CursorKind.MACRO_DEFINITION.value: 'macro',
+    cindex.CursorKind.NAMESPACE.value: 'namespace',
+    cindex.CursorKind.TYPEDEF_DECL.value: 'typedef',
+    cindex.CursorKind.CONSTRUCTOR.value: 'constructor'
+}
+
+# Chunk kinds, see cindex.completionChunkKindMap
+TYPED_TEXT = 1
+PLACEHOLDER = 3
+INFORMATIVE = 4
+RESULT_TYPE = 15
+
+# Availabilities worth offering, see cindex.availabilityKinds. Results that
+# are not available or not accessible from here, such as private members,
+# can never be used.
+usable_availabilities = frozenset((0, 1))
+
+contexts = cindex.completionContexts
+
+type_contexts = contexts['AnyType'] | contexts['CXXClassTypeValue'] \
+    | contexts['NestedNameSpecifier']
+
+# Contexts in which results of a cursor kind make sense, kinds not listed
+# here are offered wherever libclang returns them.
+kind_contexts = {
+    cindex.CursorKind.NAMESPACE.value:
+        contexts['Namespace'] | contexts['NestedNameSpecifier'],
+    cindex.CursorKind.NAMESPACE_ALIAS.value:
+        contexts['Namespace'] | contexts['NestedNameSpecifier'],
+    cindex.CursorKind.CLASS_DECL.value: type_contexts | contexts['ClassTag'],
+    cindex.CursorKind.STRUCT_DECL.value: type_contexts | contexts['StructTag'],
+    cindex.CursorKind.UNION_DECL.value: type_contexts | contexts['UnionTag'],
+    cindex.CursorKind.ENUM_DECL.value: type_contexts | contexts['EnumTag'],
+    cindex.CursorKind.CLASS_TEMPLATE.value: type_contexts | contexts['ClassTag'],
+    cindex.CursorKind.TYPEDEF_DECL.value: type_contexts,
+    cindex.CursorKind.MACRO_DEFINITION.value:
+        contexts['AnyType'] | contexts['AnyValue'] | contexts['MacroName']
+}
+
+
+member_access_contexts = contexts['DotMemberAccess'] | contexts['ArrowMemberAccess'] \
+    | contexts['ObjCPropertyAccess']
+
+
+def is_global_scope(completion_contexts):
+    """True if completion_contexts allows any value or type, not just members."""
+
+    unknown = contexts['Unknown']
+
+    if completion_contexts & unknown == unknown:
+        return False
+
+    return completion_contexts & (contexts['AnyValue'] | contexts['AnyType']) != 0 \
+        and completion_contexts & member_access_contexts == 0
+
+
+def result_filter(completion_contexts):
+    """
+    Returns a predicate on cursor kind and availability accepting only the
+    results usable in completion_contexts.
+    """
+
+    unknown = contexts['Unknown']
+
+    # Nothing is known about where completion was invoked. Newer libclang
+    # versions set additional bits for unknown contexts.
+    if completion_contexts == contexts['Unexposed'] \
+            or completion_contexts & unknown == unknown:
+        def accept(cursor_kind, availability):
+            return availability in usable_availabilities
+    else:
+        def accept(cursor_kind, availability):
+            return availability in usable_availabilities \
+                and kind_contexts.get(cursor_kind, completion_contexts) & completion_contexts != 0
+
+    return accept
+
+
+def parse_completion_result(completion_result):
+    """
+    Converts a result as extracted by CodeCompletionResults.extract into a
+    (representation, insertion, typed text, priority) tuple.
+    """
+
+    chunks, priority, availability, cursor_kind = completion_result
+
+    return_type = None
+
+    insertion = ''
+    representation = ''
+    typed_text = ''
+    start = False
+    placeholder_count = 0
+
+    for chunk_kind, chunk_string in chunks:
+        if chunk_kind == TYPED_TEXT:
+            start = True
+
+            typed_text += chunk_string
+
+        if chunk_kind == RESULT_TYPE:
+            return_type = chunk_string
+        else:
+            representation += chunk_string
+
+        if start and chunk_kind != INFORMATIVE:
+            if chunk_kind == PLACEHOLDER:
+                placeholder_count += 1
+
+                insertion += '${%d:%s}' % (placeholder_count, chunk_string)
+            else:
+                insertion += chunk_string
+
+    if not return_type:
+        return_type = return_types.get(cursor_kind, None)
+
+    if return_type:
+        representation += "\t%s" % return_type
+
+    return representation, insertion, typed_text, priority
+
+
+class LazyCompletions(object):
+    """
+    Completion candidates of CodeCompletionResults whose items are only built
+    when selected. The results are retained, so candidates left out of one
+    selection can still be built once a longer prefix selects them.
+    """
+
+    completions = None
+
+    summaries = None
+
+    lock = None
+
+    def __init__(self, completions):
+        self.completions = completions
+        self.summaries = completions.summarize(result_filter(completions.contexts))
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.summaries)
+
+    @property
+    def candidates(self):
+        """Candidates for CandidateTable, without representation and insertion."""
+
+        return [(None, None, typed_text, priority) for _, typed_text, priority in self.summaries]
+
+    def materialize(self, positions):
+        """Returns the (representation, insertion) items of the candidates at positions."""
+
+        indices = [self.summaries[position][0] for position in positions]
+
+        with self.lock:
+            results = self.completions.extract(indices=indices)
+
+        return [parse_completion_result(result)[:2] for result in results]
+
+
+def build_completions(completions):
+    """
+    Converts CodeCompletionResults into (representation, insertion, typed
+    text, priority) tuples. They are left unordered, ranking and selecting
+    the best of them is up to completion.ranking.CandidateTable.
+
+    Results that cannot be used where completion was invoked are dropped
+    before their text is extracted.
+    """
+
+    accept = result_filter(completions.contexts)
+
+    return [parse_completion_result(result) for result in completions.extract(accept)]
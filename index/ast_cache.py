@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import os.path
+
+from ..clang import cindex
+
+
+class AstCache(object):
+    """
+    Persists parsed translation units as AST files so they can be loaded
+    instead of reparsed when the editor restarts.
+
+    Each entry consists of an .ast file and a .json manifest holding a hash of
+    the compile arguments and the modification times of every file the unit
+    included. An entry is only loaded when both still match.
+    """
+
+    directory = None
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def hash_arguments(arguments):
+        return hashlib.sha1('\0'.join(arguments).encode()).hexdigest()
+
+    @staticmethod
+    def modification_time(file_name):
+        try:
+            return os.path.getmtime(file_name)
+        except OSError:
+            return None
+
+    def entry_path(self, file_name):
+        return os.path.join(
+            self.directory,
+            hashlib.sha1(file_name.encode()).hexdigest()
+        )
+
+    def read_manifest(self, file_name):
+        try:
+            with open(self.entry_path(file_name) + '.json', 'r') as manifest:
+                return json.load(manifest)
+        except (OSError, ValueError):
+            return None
+
+    def is_valid(self, file_name, arguments):
+        manifest = self.read_manifest(file_name)
+
+        if manifest is None:
+            return False
+
+        if manifest.get('arguments') != self.hash_arguments(arguments):
+            return False
+
+        for dependency, mtime in manifest.get('dependencies', {}).items():
+            if self.modification_time(dependency) != mtime:
+                return False
+
+        return os.path.exists(self.entry_path(file_name) + '.ast')
+
+    def load(self, file_name, arguments, index):
+        """
+        Returns the cached translation unit for file_name, or None when there
+        is no entry or the entry is stale.
+        """
+
+        if not self.is_valid(file_name, arguments):
+            return None
+
+        ast_file = self.entry_path(file_name) + '.ast'
+
+        try:
+            return cindex.TranslationUnit.from_ast_file(ast_file.encode(), index)
+        except cindex.TranslationUnitLoadError:
+            return None
+
+    def dependencies(self, file_name, translation_unit, parsed_at):
+        """
+        Returns the modification times of every file translation_unit was
+        built from, to be read right after parsing it. Returns None if any of
+        them changed after parsed_at, the time parsing started, as the unit
+        may then hold their old content.
+        """
+
+        dependencies = {
+            file_name: self.modification_time(file_name)
+        }
+
+        for inclusion in translation_unit.get_includes():
+            dependency = inclusion.include.name.decode()
+
+            dependencies[dependency] = self.modification_time(dependency)
+
+        for mtime in dependencies.values():
+            if mtime is not None and mtime >= parsed_at:
+                return None
+
+        return dependencies
+
+    def store(self, file_name, arguments, translation_unit, dependencies):
+        """
+        Saves translation_unit along with the dependencies returned by
+        dependencies() when it was parsed.
+        """
+
+        entry_path = self.entry_path(file_name)
+
+        try:
+            translation_unit.save((entry_path + '.ast').encode())
+        except cindex.TranslationUnitSaveError:
+            self.discard(file_name)
+
+            return False
+
+        with open(entry_path + '.json', 'w') as manifest:
+            json.dump({
+                'file': file_name,
+                'arguments': self.hash_arguments(arguments),
+                'dependencies': dependencies
+            }, manifest)
+
+        return True
+
+    def discard(self, file_name):
+        entry_path = self.entry_path(file_name)
+
+        for extension in ('.ast', '.json'):
+            if os.path.exists(entry_path + extension):
+                os.remove(entry_path + extension)
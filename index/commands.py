@@ -0,0 +1,60 @@
+import os.path
+import threading
+
+from ..clang import cindex
+
+
+class CompileCommandsCache(object):
+    """
+    Loads the compile commands of a build directory once and hands out the
+    same mapping of source file to compile arguments until
+    compile_commands.json is modified.
+    """
+
+    entries = None
+
+    lock = None
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def stamp(build_directory):
+        try:
+            stat = os.stat(os.path.join(build_directory, 'compile_commands.json'))
+        except OSError:
+            return None
+
+        return stat.st_mtime, stat.st_size
+
+    def load(self, build_directory):
+        """
+        Returns the CompilationDatabase for build_directory and a dict mapping
+        each source file's normalized path to its compile arguments.
+        """
+
+        stamp = self.stamp(build_directory)
+
+        with self.lock:
+            entry = self.entries.get(build_directory)
+
+            if entry is not None and stamp is not None and entry[0] == stamp:
+                return entry[1], entry[2]
+
+        compilation_database = cindex.CompilationDatabase.fromDirectory(
+            build_directory.encode()
+        )
+
+        compile_commands = {}
+
+        for file_name, directory, arguments in compilation_database.getAllCompileCommandTuples():
+            compile_commands[os.path.normpath(os.path.join(directory, file_name))] = arguments
+
+        with self.lock:
+            self.entries[build_directory] = (stamp, compilation_database, compile_commands)
+
+        return compilation_database, compile_commands
+
+
+compile_commands_cache = CompileCommandsCache()
@@ -0,0 +1,674 @@
+from functools import partial
+import multiprocessing
+import os.path
+import threading
+import time
+import zlib
+
+from ..clang import cindex
+from ..completion.documentation import find_brief_comment
+from ..completion.globals import GlobalCompletionCache, tag_completions
+from ..completion.results import LazyCompletions, build_completions, is_global_scope, result_filter
+
+from .ast_cache import AstCache
+from .commands import compile_commands_cache
+from .includes import IncludeIndex
+from .lru import TranslationUnitCache
+from .profiles import parse_options, satisfies
+from .scheduler import Scheduler
+from .stats import IndexingStats
+
+
+def partition_of(file_name, partitions):
+    """Returns the stable partition file_name is assigned to."""
+
+    return zlib.crc32(file_name.encode()) % partitions
+
+
+class TranslationUnitDatabase(object):
+
+    build_directory = None
+
+    lazy = False
+
+    compilation_database = None
+
+    index = None
+
+    compile_commands = None
+
+    translation_units = None
+
+    ast_cache = None
+
+    profiles = None
+
+    parse_profiles = None
+
+    brief_comments = False
+
+    workers = 1
+
+    scheduler = None
+
+    lock = None
+
+    unit_locks = None
+
+    versions = None
+
+    include_index = None
+
+    preambles = None
+
+    sibling_lookups = None
+
+    global_completions = None
+
+    stats = None
+
+    on_progress = None
+
+    partition = None
+
+    def __init__(self, build_directory, workers=None, lazy=False,
+                 memory_budget=None, ast_cache=True, parse_profiles=None,
+                 brief_comments=False, partition=None):
+        self.build_directory = build_directory
+
+        self.lazy = lazy
+
+        self.partition = partition
+
+        self.load_compile_commands()
+
+        self.index = cindex.Index.create()
+
+        if memory_budget is not None:
+            memory_budget *= 1024 * 1024
+
+        self.translation_units = TranslationUnitCache(memory_budget)
+
+        if ast_cache:
+            self.ast_cache = AstCache(os.path.join(build_directory, 'ast_cache'))
+
+        self.profiles = {}
+
+        self.parse_profiles = parse_profiles or {}
+
+        self.brief_comments = brief_comments
+
+        self.lock = threading.Lock()
+
+        self.unit_locks = {}
+
+        self.versions = {}
+
+        self.include_index = IncludeIndex()
+
+        self.preambles = {}
+
+        self.sibling_lookups = set()
+
+        self.global_completions = GlobalCompletionCache()
+
+        self.stats = IndexingStats()
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+
+        self.workers = max(1, workers)
+
+        self.scheduler = Scheduler(self.workers)
+
+    def close(self):
+        self.scheduler.shutdown()
+
+    def owns(self, file_name):
+        """
+        True if this database is responsible for parsing file_name in the
+        background. When the project is split over several worker processes
+        each one is given a partition, index and count, of the files.
+        """
+
+        if self.partition is None:
+            return True
+
+        index, count = self.partition
+
+        return partition_of(file_name, count) == index
+
+    def progress(self, message):
+        if self.on_progress is not None:
+            self.on_progress(message)
+
+    def load_compile_commands(self):
+        self.compilation_database, self.compile_commands = compile_commands_cache.load(
+            self.build_directory
+        )
+
+    def unit_lock(self, file_name):
+        """
+        Returns the lock serializing libclang calls on the translation unit
+        for file_name, translation units are not safe to share across threads.
+        """
+
+        with self.lock:
+            return self.unit_locks.setdefault(file_name, threading.RLock())
+
+    def update_includes(self, file_name, translation_unit):
+        """
+        Records the headers translation_unit includes along with a stamp of
+        its preamble, the compile arguments and the included headers' mtimes.
+        """
+
+        self.include_index.update(file_name, translation_unit)
+
+        headers = []
+
+        for header in self.include_index.includes.get(file_name, ()):
+            try:
+                headers.append((header, os.path.getmtime(header)))
+            except OSError:
+                headers.append((header, None))
+
+        self.preambles[file_name] = (
+            self.compile_commands.get(file_name),
+            frozenset(headers)
+        )
+
+    def load_file(self, file_name):
+        """Loads the translation unit for file_name from the AST cache."""
+
+        if self.ast_cache is None:
+            return None
+
+        translation_unit = self.ast_cache.load(
+            file_name,
+            self.compile_commands[file_name],
+            self.index
+        )
+
+        if translation_unit is not None:
+            self.profiles[file_name] = 'ast'
+
+            self.update_includes(file_name, translation_unit)
+
+            self.translation_units[file_name] = translation_unit
+
+        return translation_unit
+
+    def parse_file(self, file_name, profile='background'):
+        """
+        Parses a single compile command, libclang releases the GIL for the
+        duration of the parse so this is safe to run from a worker thread.
+        """
+
+        arguments = self.compile_commands[file_name]
+
+        options = parse_options(profile, self.parse_profiles, self.brief_comments)
+
+        started = time.time()
+
+        try:
+            translation_unit = self.index.parse(None, arguments, options=options)
+        except cindex.TranslationUnitLoadError:
+            print('Failed to parse %s' % file_name)
+
+            return None
+
+        self.profiles[file_name] = profile
+
+        self.versions.pop(file_name, None)
+
+        self.update_includes(file_name, translation_unit)
+
+        self.translation_units[file_name] = translation_unit
+
+        self.stats.record(
+            file_name,
+            'parse',
+            started,
+            self.translation_units.costs.get(file_name, 0)
+        )
+
+        if self.ast_cache is not None:
+            dependencies = self.ast_cache.dependencies(file_name, translation_unit, started)
+
+            # Stores overtake queued background parses, otherwise every unit
+            # parsed while indexing stays referenced by its store job until
+            # the whole batch was parsed, whatever the memory budget.
+            if dependencies is not None:
+                self.scheduler.submit(
+                    ('store', file_name),
+                    partial(self.store_file, file_name, translation_unit, dependencies),
+                    Scheduler.OPEN
+                )
+
+        return translation_unit
+
+    def store_file(self, file_name, translation_unit, dependencies):
+        with self.unit_lock(file_name):
+            self.ast_cache.store(
+                file_name,
+                self.compile_commands[file_name],
+                translation_unit,
+                dependencies
+            )
+
+    def schedule(self, file_name, priority=Scheduler.BACKGROUND, owner=None,
+                 profile='background', callback=None):
+        """Queues loading the translation unit for file_name on the scheduler."""
+
+        return self.scheduler.submit(
+            ('parse', file_name, profile),
+            partial(self.get, file_name, profile),
+            priority,
+            owner,
+            callback
+        )
+
+    def schedule_reparse(self, file_name, unsaved_files=None, version=None):
+        """
+        Queues reparsing file_name ahead of any other work. A reparse still
+        queued for the file is updated to the newer unsaved files instead.
+        """
+
+        return self.scheduler.submit(
+            ('reparse', file_name),
+            partial(self.reparse, file_name, unsaved_files, version),
+            Scheduler.ACTIVE
+        )
+
+    def parse_files(self, file_names, priority=Scheduler.BACKGROUND, owner=None):
+        """
+        Queues file_names for parsing, the throughput of the batch is reported
+        once every file has been parsed or cancelled.
+        """
+
+        started = time.time()
+
+        remaining = len(file_names)
+
+        parsed = 0
+
+        def finished(job):
+            nonlocal remaining, parsed
+
+            with self.lock:
+                remaining -= 1
+
+                if job.result is not None:
+                    parsed += 1
+
+                if remaining > 0:
+                    self.progress('Indexing translation units %d/%d' % (
+                        len(file_names) - remaining,
+                        len(file_names)
+                    ))
+
+                    return
+
+            batch = self.stats.record_batch(parsed, started, self.workers)
+
+            message = 'Indexed %d translation units in %.2fs (%.1f files/s, %d workers)' % (
+                parsed,
+                batch['elapsed'],
+                batch['throughput'],
+                self.workers
+            )
+
+            print(message)
+
+            self.progress(message)
+
+        for file_name in file_names:
+            self.schedule(file_name, priority, owner, callback=finished)
+
+    def satisfies(self, file_name, profile):
+        return satisfies(self.profiles.get(file_name, 'ast'), profile)
+
+    def get(self, file_name, profile='background'):
+        """
+        Returns the translation unit for file_name, loading it from the AST
+        cache or parsing it the first time it is requested. Returns None for
+        files without a compile command.
+
+        A unit parsed with a cheaper profile than requested, such as one
+        loaded from the AST cache, is replaced by a fresh parse.
+        """
+
+        if file_name not in self.compile_commands:
+            return None
+
+        translation_unit = self.translation_units.get(file_name)
+
+        if translation_unit is None or not self.satisfies(file_name, profile):
+            with self.unit_lock(file_name):
+                translation_unit = self.translation_units.get(file_name)
+
+                if translation_unit is None and profile != 'editing':
+                    translation_unit = self.load_file(file_name)
+
+                if translation_unit is None or not self.satisfies(file_name, profile):
+                    translation_unit = self.parse_file(file_name, profile)
+
+        return translation_unit
+
+    def discard(self, file_name):
+        """Drops the translation unit for file_name and all state about it."""
+
+        with self.unit_lock(file_name):
+            self.translation_units.pop(file_name)
+
+            self.profiles.pop(file_name, None)
+
+            self.versions.pop(file_name, None)
+
+            self.include_index.discard(file_name)
+
+            self.preambles.pop(file_name, None)
+
+            self.global_completions.discard(file_name)
+
+    def refresh(self):
+        """
+        Reloads the compilation database after CMake regenerated it. Only
+        units whose compile arguments changed or that are new are parsed,
+        units for files that are no longer built are disposed.
+        """
+
+        previous_commands = self.compile_commands
+
+        self.load_compile_commands()
+
+        self.sibling_lookups.clear()
+
+        for file_name in previous_commands:
+            if file_name not in self.compile_commands:
+                self.discard(file_name)
+
+                if self.ast_cache is not None:
+                    self.ast_cache.discard(file_name)
+
+        background = []
+
+        editing = []
+
+        for file_name, arguments in self.compile_commands.items():
+            if previous_commands.get(file_name) == arguments:
+                continue
+
+            if not self.owns(file_name):
+                continue
+
+            profile = self.profiles.get(file_name)
+
+            self.discard(file_name)
+
+            if profile == 'editing':
+                editing.append(file_name)
+            elif profile is not None or not self.lazy:
+                background.append(file_name)
+
+        for file_name in editing:
+            self.schedule(file_name, Scheduler.OPEN, profile='editing')
+
+        if background:
+            self.parse_files(background)
+
+    def index_project(self):
+        """Queues every file of the project unless the database is lazy."""
+
+        if not self.lazy:
+            self.parse_files(list(filter(self.owns, self.compile_commands)))
+
+    def prioritize(self, active_file, open_files, owner=None):
+        """
+        Moves work for a window ahead of the rest of the project, the active
+        file first, then the other open files and finally the files next to
+        them.
+        """
+
+        directories = set()
+
+        for file_name in open_files:
+            if file_name not in self.compile_commands or not self.owns(file_name):
+                continue
+
+            if file_name == active_file:
+                priority = Scheduler.ACTIVE
+            else:
+                priority = Scheduler.OPEN
+
+            self.schedule(file_name, priority, owner, profile='editing')
+
+            directories.add(os.path.dirname(file_name))
+
+        if not self.lazy:
+            for file_name in filter(self.owns, self.compile_commands):
+                if os.path.dirname(file_name) in directories:
+                    self.schedule(file_name, Scheduler.NEARBY, owner)
+
+    def cancel(self, owner):
+        return self.scheduler.cancel(owner)
+
+    def report(self, limit=10):
+        return self.stats.report(limit)
+
+    def complete(self, source, file_name, line, column, unsaved_files=None,
+                 global_scope=False, lazy=True):
+        """
+        Completes at line and column of file_name, which is either source or
+        a header included by it, and returns the completion items.
+
+        global_scope hints that completion is not invoked on a member access,
+        in which case the items contributed by the preamble are cached. Not
+        for headers though, whose unsaved contents are part of the preamble.
+        Otherwise the items are returned as LazyCompletions unless lazy is
+        False.
+        """
+
+        translation_unit = self.get(source, profile='editing')
+
+        if translation_unit is None:
+            return None
+
+        with self.unit_lock(source):
+            if global_scope and file_name.decode() == source:
+                return self.complete_global_scope(
+                    translation_unit,
+                    source,
+                    file_name,
+                    line,
+                    column,
+                    unsaved_files
+                )
+
+            completions = translation_unit.codeComplete(
+                file_name,
+                line,
+                column,
+                unsaved_files
+            )
+
+        if completions is None:
+            return None
+
+        if lazy:
+            return LazyCompletions(completions)
+
+        return build_completions(completions)
+
+    def documentation(self, source, file_name, line, column, typed_text,
+                      representation, unsaved_files=None):
+        """
+        Returns the brief comment of the completion item with typed_text and
+        representation at line and column of file_name, or '' if it has none.
+        Completes again with brief comments included, which the regular
+        completion path leaves out to stay fast.
+
+        Documentation is not worth delaying completion or reparsing for, so
+        None is returned right away if the translation unit is busy.
+        """
+
+        translation_unit = self.get(source, profile='editing')
+
+        if translation_unit is None:
+            return None
+
+        lock = self.unit_lock(source)
+
+        if not lock.acquire(blocking=False):
+            return None
+
+        try:
+            completions = translation_unit.codeComplete(
+                file_name,
+                line,
+                column,
+                unsaved_files,
+                include_brief_comments=True
+            )
+
+            if completions is None:
+                return None
+
+            return find_brief_comment(completions, typed_text, representation)
+        finally:
+            lock.release()
+
+    def complete_global_scope(self, translation_unit, source, file_name, line,
+                              column, unsaved_files):
+        """
+        Completes without the preamble's declarations and merges the results
+        with the preamble's items, which are converted once per preamble and
+        completion contexts and cached. Must be called holding the unit lock
+        of source, and only when completing in source itself.
+        """
+
+        local = translation_unit.codeComplete(
+            file_name,
+            line,
+            column,
+            unsaved_files,
+            skip_preamble=True
+        )
+
+        if local is None:
+            return None
+
+        completion_contexts = local.contexts
+
+        if not is_global_scope(completion_contexts):
+            # Members may be declared in the preamble, so these need the
+            # full results after all.
+            completions = translation_unit.codeComplete(
+                file_name,
+                line,
+                column,
+                unsaved_files
+            )
+
+            return build_completions(completions) if completions is not None else None
+
+        local_items = tag_completions(local)
+
+        local_completions = set(entry[2] for entry in local_items)
+
+        stamp = self.preambles.get(source)
+
+        preamble_items = self.global_completions.get(source, stamp, completion_contexts)
+
+        if preamble_items is None:
+            completions = translation_unit.codeComplete(
+                file_name,
+                line,
+                column,
+                unsaved_files
+            )
+
+            if completions is None:
+                return None
+
+            preamble_items = [
+                entry for entry in tag_completions(completions)
+                if entry[2] not in local_completions
+            ]
+
+            self.global_completions.put(source, stamp, completion_contexts, preamble_items)
+
+        accept = result_filter(completion_contexts)
+
+        return [entry[2] for entry in local_items if accept(entry[0], entry[1])] + [
+            entry[2] for entry in preamble_items
+            if entry[2] not in local_completions and accept(entry[0], entry[1])
+        ]
+
+    def resolve(self, file_name):
+        """
+        Returns the file whose translation unit serves file_name. Source files
+        map to themselves and headers to the cheapest unit including them, or
+        None if no known unit includes the header.
+        """
+
+        if file_name in self.compile_commands:
+            return file_name
+
+        # Siblings are only looked for once per header, resolving is done on
+        # the UI thread and on every modification.
+        if file_name not in self.include_index and file_name not in self.sibling_lookups:
+            self.sibling_lookups.add(file_name)
+
+            self.parse_sibling(file_name)
+
+        return self.include_index.find(file_name)
+
+    def parse_sibling(self, header):
+        """
+        Queues the source file sharing the header's name, which usually
+        includes it, for headers whose includers have not been parsed yet.
+        """
+
+        stem = os.path.splitext(header)[0]
+
+        for file_name in filter(self.owns, self.compile_commands):
+            if os.path.splitext(file_name)[0] == stem:
+                self.schedule(file_name, Scheduler.ACTIVE)
+
+    def reparse(self, file_name, unsaved_files=None, version=None):
+        """
+        Reparses the editing translation unit for file_name against
+        unsaved_files, version identifies the buffer state the unsaved files
+        were taken at and is used to skip reparsing an unchanged buffer.
+        """
+
+        translation_unit = self.get(file_name, profile='editing')
+
+        if translation_unit is None:
+            return None
+
+        started = None
+
+        with self.unit_lock(file_name):
+            if version is None or self.versions.get(file_name) != version:
+                started = time.time()
+
+                translation_unit.reparse(unsaved_files)
+
+                self.versions[file_name] = version
+
+                self.update_includes(file_name, translation_unit)
+
+                # Reads the unit's resource usage, so this needs the lock too
+                self.translation_units.remeasure(file_name)
+
+        if started is not None:
+            self.stats.record(
+                file_name,
+                'reparse',
+                started,
+                self.translation_units.costs.get(file_name, 0)
+            )
+
+        return translation_unit
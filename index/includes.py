@@ -0,0 +1,59 @@
+import os.path
+import threading
+
+
+class IncludeIndex(object):
+    """
+    Inverse include graph, mapping each included header to the translation
+    units including it along with the number of files each of those units
+    includes, which is used as a measure of how expensive it is to parse.
+    """
+
+    includers = None
+
+    includes = None
+
+    lock = None
+
+    def __init__(self):
+        self.includers = {}
+        self.includes = {}
+        self.lock = threading.RLock()
+
+    def __contains__(self, header):
+        return header in self.includers
+
+    def update(self, file_name, translation_unit):
+        headers = set(
+            os.path.normpath(inclusion.include.name.decode())
+            for inclusion in translation_unit.get_includes()
+        )
+
+        with self.lock:
+            self.discard(file_name)
+
+            self.includes[file_name] = headers
+
+            for header in headers:
+                self.includers.setdefault(header, {})[file_name] = len(headers)
+
+    def discard(self, file_name):
+        with self.lock:
+            for header in self.includes.pop(file_name, ()):
+                includers = self.includers.get(header, {})
+
+                includers.pop(file_name, None)
+
+                if not includers:
+                    self.includers.pop(header, None)
+
+    def find(self, header):
+        """Returns the cheapest translation unit including header, or None."""
+
+        with self.lock:
+            includers = self.includers.get(header)
+
+            if not includers:
+                return None
+
+            return min(includers, key=lambda file_name: (includers[file_name], file_name))
@@ -0,0 +1,43 @@
+import json
+import struct
+
+# Messages are JSON objects without whitespace, each preceded by its length
+# as a 4 byte big endian integer.
+header = struct.Struct('>I')
+
+
+def send_message(stream, message):
+    payload = json.dumps(message, separators=(',', ':')).encode()
+
+    stream.write(header.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def read_exactly(stream, length):
+    data = b''
+
+    while len(data) < length:
+        chunk = stream.read(length - len(data))
+
+        if not chunk:
+            return None
+
+        data += chunk
+
+    return data
+
+
+def receive_message(stream):
+    """Reads the next message from stream, returns None once it is closed."""
+
+    length = read_exactly(stream, header.size)
+
+    if length is None:
+        return None
+
+    payload = read_exactly(stream, header.unpack(length)[0])
+
+    if payload is None:
+        return None
+
+    return json.loads(payload.decode())
@@ -0,0 +1,91 @@
+import collections
+import threading
+
+
+class TranslationUnitCache(object):
+    """
+    Maps file names to translation units, keeping them in least recently used
+    order. When the memory libclang reports for the cached units exceeds the
+    budget (in bytes) the least recently used units are dropped, which
+    disposes them as soon as no completion or parse still holds a reference.
+    """
+
+    budget = None
+
+    entries = None
+
+    costs = None
+
+    lock = None
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.entries = collections.OrderedDict()
+        self.costs = {}
+        self.lock = threading.RLock()
+
+    def __setitem__(self, file_name, translation_unit):
+        cost = self.measure(translation_unit)
+
+        with self.lock:
+            self.entries[file_name] = translation_unit
+            self.entries.move_to_end(file_name)
+            self.costs[file_name] = cost
+
+            self.evict()
+
+    @staticmethod
+    def measure(translation_unit):
+        try:
+            return sum(translation_unit.resource_usage.values())
+        except AttributeError:
+            return 0
+
+    @property
+    def total(self):
+        return sum(self.costs.values())
+
+    def get(self, file_name, default=None):
+        with self.lock:
+            translation_unit = self.entries.get(file_name)
+
+            if translation_unit is None:
+                return default
+
+            self.entries.move_to_end(file_name)
+
+        return translation_unit
+
+    def peek(self, file_name, default=None):
+        """Returns a cached translation unit without marking it as used."""
+        return self.entries.get(file_name, default)
+
+    def pop(self, file_name, default=None):
+        with self.lock:
+            self.costs.pop(file_name, None)
+
+            return self.entries.pop(file_name, default)
+
+    def remeasure(self, file_name):
+        translation_unit = self.peek(file_name)
+
+        if translation_unit is not None:
+            cost = self.measure(translation_unit)
+
+            with self.lock:
+                if file_name in self.entries:
+                    self.costs[file_name] = cost
+
+                    self.evict()
+
+    def evict(self):
+        if self.budget is None:
+            return
+
+        with self.lock:
+            # The most recently used unit is kept even if it alone exceeds
+            # the budget, otherwise it would be reparsed on every access.
+            while len(self.entries) > 1 and self.total > self.budget:
+                file_name, _ = self.entries.popitem(last=False)
+
+                self.costs.pop(file_name, None)
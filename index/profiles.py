@@ -0,0 +1,64 @@
+from ..clang import cindex
+
+# Translation units backing open views are reparsed and completed in
+# repeatedly, so they keep a precompiled preamble and cached completions.
+# Background units only serve header lookups and declarations, so function
+# bodies are skipped and template instantiation at the end of the unit is
+# left out. They are upgraded to a full parse once their file is edited.
+default_profiles = {
+    'editing': [
+        'DEFAULT_EDITING',
+        'PRECOMPILED_PREAMBLE',
+        'CACHE_COMPLETION_RESULTS'
+    ],
+    'background': [
+        'SKIP_FUNCTION_BODIES',
+        'INCOMPLETE'
+    ]
+}
+
+# Units loaded from the AST cache can not be reparsed, they only satisfy
+# requests for a background unit.
+profile_ranks = {
+    'ast': 0,
+    'background': 0,
+    'editing': 1
+}
+
+
+def flag_value(flag):
+    if flag == 'DEFAULT_EDITING':
+        return cindex.TranslationUnit.default_editing_options()
+
+    return getattr(cindex.TranslationUnit, 'PARSE_%s' % flag)
+
+
+def parse_options(profile, profiles=None, brief_comments=False):
+    """
+    Returns the PARSE_XXX bitmask for profile. profiles optionally overrides
+    the flag list of each profile, e.g. {"background": ["INCOMPLETE"]}, where
+    flags are named as TranslationUnit.PARSE_XXX without the PARSE_ prefix.
+
+    brief_comments adds INCLUDE_BRIEF_COMMENTS_IN_CODE_COMPLETION to editing
+    units. libclang builds the cached completion results without comments
+    otherwise, leaving preamble declarations undocumented, but it makes every
+    reparse collect them.
+    """
+
+    flags = (profiles or {}).get(profile, default_profiles[profile])
+
+    options = cindex.TranslationUnit.PARSE_NONE
+
+    if brief_comments and profile == 'editing':
+        options |= flag_value('INCLUDE_BRIEF_COMMENTS_IN_CODE_COMPLETION')
+
+    for flag in flags:
+        options |= flag_value(flag.upper())
+
+    return options
+
+
+def satisfies(current, requested):
+    """True if a unit parsed with profile current can serve requested."""
+
+    return profile_ranks[current] >= profile_ranks[requested]
@@ -0,0 +1,400 @@
+import itertools
+import os
+import os.path
+import subprocess
+import threading
+
+from ..clang import cindex
+
+from .database import partition_of
+from .ipc import receive_message, send_message
+from .stats import IndexingStats
+
+
+class WorkerError(Exception):
+    """Represents a request that failed or could not reach a worker."""
+    pass
+
+
+class WorkerProcess(object):
+    """
+    Client for a single index.worker process. The process is restarted with
+    the same database settings if it died, for example because libclang
+    crashed, since the last request. Requests posted with restore, such as
+    queueing the project for indexing, are sent again after a restart.
+    Every process gets a map of its own pending requests, so a process going
+    away only fails the requests sent to it.
+
+    Whatever the worker writes to stderr is printed to the console.
+    """
+
+    command = None
+
+    environment = None
+
+    open_request = None
+
+    restored = None
+
+    start_timeout = 60
+
+    on_progress = None
+
+    process = None
+
+    pending = None
+
+    counter = None
+
+    lock = None
+
+    start_lock = None
+
+    def __init__(self, command, environment, open_request, on_progress=None):
+        self.command = command
+        self.environment = environment
+        self.open_request = open_request
+        self.on_progress = on_progress
+        self.restored = {}
+        self.pending = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Starts the process unless another thread already restarted it."""
+
+        with self.start_lock:
+            if self.alive:
+                return
+
+            try:
+                process = subprocess.Popen(
+                    self.command,
+                    env=self.environment,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                )
+            except OSError as e:
+                raise WorkerError('Failed to start worker: %s' % e)
+
+            pending = {}
+
+            with self.lock:
+                self.process = process
+                self.pending = pending
+
+            threading.Thread(
+                target=self.read,
+                args=(process, pending),
+                daemon=True
+            ).start()
+
+            threading.Thread(
+                target=self.read_errors,
+                args=(process,),
+                daemon=True
+            ).start()
+
+            self.send(dict(self.open_request), wait=True, timeout=self.start_timeout)
+
+            for message in list(self.restored.values()):
+                self.send(dict(message))
+
+    @staticmethod
+    def read_errors(process):
+        for line in process.stderr:
+            print('Index worker: %s' % line.decode(errors='replace').rstrip())
+
+    def read(self, process, pending):
+        while True:
+            message = receive_message(process.stdout)
+
+            if message is None:
+                break
+
+            if message.get('event') == 'progress':
+                if self.on_progress is not None:
+                    self.on_progress(message['message'])
+
+                continue
+
+            request = pending.pop(message.get('id'), None)
+
+            if request is not None:
+                request['response'] = message
+                request['done'].set()
+
+        # Fail everything still waiting on the process that went away
+        for request_id in list(pending):
+            request = pending.pop(request_id, None)
+
+            if request is not None:
+                request['done'].set()
+
+    def send(self, message, wait=False, timeout=None):
+        request = None
+
+        with self.lock:
+            pending = self.pending
+
+            if wait:
+                request = {'done': threading.Event(), 'response': None}
+
+                message['id'] = next(self.counter)
+
+                pending[message['id']] = request
+
+            try:
+                send_message(self.process.stdin, message)
+            except (OSError, ValueError):
+                raise WorkerError('Worker process is not running')
+
+        if request is None:
+            return None
+
+        if not request['done'].wait(timeout):
+            pending.pop(message['id'], None)
+
+            raise WorkerError('Timed out waiting for %s' % message['op'])
+
+        response = request['response']
+
+        if response is None:
+            raise WorkerError('Worker process exited during %s' % message['op'])
+
+        if 'error' in response:
+            raise WorkerError(response['error'])
+
+        return response.get('result')
+
+    def call(self, op, timeout=None, **arguments):
+        if not self.alive:
+            self.start()
+
+        arguments['op'] = op
+
+        return self.send(arguments, wait=True, timeout=timeout)
+
+    def post(self, op, restore=False, **arguments):
+        arguments['op'] = op
+
+        if restore:
+            self.restored[(op, arguments.get('owner'))] = dict(arguments)
+
+        if not self.alive:
+            self.start()
+
+        self.send(arguments)
+
+    def forget(self, owner):
+        """Stops restoring requests posted for owner."""
+
+        for key in [key for key in self.restored if key[1] == owner]:
+            self.restored.pop(key, None)
+
+    def close(self):
+        if self.alive:
+            try:
+                self.send({'op': 'close'})
+
+                self.process.stdin.close()
+            except (OSError, WorkerError):
+                pass
+
+
+def decode_unsaved_files(unsaved_files):
+    return [(name.decode(), contents.decode()) for name, contents in unsaved_files or []]
+
+
+class RemoteDatabase(object):
+    """
+    Stands in for a TranslationUnitDatabase whose translation units live in
+    one or more worker processes. Files are split over the workers by
+    partition_of, so every translation unit is owned by exactly one worker.
+    """
+
+    build_directory = None
+
+    lazy = False
+
+    workers = None
+
+    completion_timeout = 5
+
+    # Reports are requested from the UI thread
+    report_timeout = 5
+
+    # Resolving runs on the UI thread and on every modification
+    resolve_timeout = 0.5
+
+    on_progress = None
+
+    def __init__(self, build_directory, processes=1, python='python3',
+                 **options):
+        self.build_directory = build_directory
+
+        self.lazy = options.get('lazy', False)
+
+        processes = max(1, processes)
+
+        package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        package = os.path.basename(package_path)
+
+        command = [python, '-m', '%s.index.worker' % package]
+
+        if cindex.Config.library_path:
+            command.extend(['--library-path', cindex.Config.library_path])
+
+        if cindex.Config.library_file:
+            command.extend(['--library-file', cindex.Config.library_file])
+
+        environment = dict(os.environ)
+        environment['PYTHONPATH'] = os.path.dirname(package_path)
+
+        self.workers = []
+
+        for index in range(processes):
+            open_request = dict(options)
+
+            open_request.update({
+                'op': 'open',
+                'build_directory': build_directory,
+                'partition': (index, processes) if processes > 1 else None
+            })
+
+            worker = WorkerProcess(command, environment, open_request, self.progress)
+
+            self.workers.append(worker)
+
+            try:
+                worker.start()
+            except WorkerError:
+                self.close()
+
+                raise
+
+    def progress(self, message):
+        if self.on_progress is not None:
+            self.on_progress(message)
+
+    def route(self, file_name):
+        return self.workers[partition_of(file_name, len(self.workers))]
+
+    def broadcast(self, op, restore=False, **arguments):
+        for worker in self.workers:
+            worker.post(op, restore, **arguments)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def index_project(self):
+        self.broadcast('index_project', restore=True)
+
+    def prioritize(self, active_file, open_files, owner=None):
+        self.broadcast(
+            'prioritize',
+            restore=True,
+            active_file=active_file,
+            open_files=open_files,
+            owner=owner
+        )
+
+    def schedule(self, file_name, priority, owner=None, profile='background'):
+        self.route(file_name).post(
+            'schedule',
+            file_name=file_name,
+            priority=priority,
+            owner=owner,
+            profile=profile
+        )
+
+    def cancel(self, owner):
+        for worker in self.workers:
+            worker.forget(owner)
+
+        self.broadcast('cancel', owner=owner)
+
+    def refresh(self):
+        self.broadcast('refresh')
+
+    def report(self, limit=10):
+        stats = IndexingStats()
+
+        for worker in self.workers:
+            try:
+                stats.merge(worker.call('stats', timeout=self.report_timeout))
+            except WorkerError as e:
+                print('Failed to fetch indexing stats: %s' % e)
+
+        return stats.report(limit)
+
+    def resolve(self, file_name):
+        for worker in self.workers:
+            try:
+                source = worker.call(
+                    'resolve',
+                    timeout=self.resolve_timeout,
+                    file_name=file_name
+                )
+            except WorkerError as e:
+                print('Failed to resolve %s: %s' % (file_name, e))
+
+                continue
+
+            if source is not None:
+                return source
+
+        return None
+
+    def schedule_reparse(self, file_name, unsaved_files=None, version=None):
+        self.route(file_name).post(
+            'schedule_reparse',
+            file_name=file_name,
+            unsaved_files=decode_unsaved_files(unsaved_files),
+            version=version
+        )
+
+    def complete(self, source, file_name, line, column, unsaved_files=None,
+                 global_scope=False):
+        try:
+            return self.route(source).call(
+                'complete',
+                timeout=self.completion_timeout,
+                source=source,
+                file_name=file_name.decode(),
+                line=line,
+                column=column,
+                unsaved_files=decode_unsaved_files(unsaved_files),
+                global_scope=global_scope
+            )
+        except WorkerError as e:
+            print('Completion failed: %s' % e)
+
+            return None
+
+    def documentation(self, source, file_name, line, column, typed_text,
+                      representation, unsaved_files=None):
+        try:
+            return self.route(source).call(
+                'documentation',
+                timeout=self.completion_timeout,
+                source=source,
+                file_name=file_name.decode(),
+                line=line,
+                column=column,
+                typed_text=typed_text,
+                representation=representation,
+                unsaved_files=decode_unsaved_files(unsaved_files)
+            )
+        except WorkerError as e:
+            print('Fetching documentation failed: %s' % e)
+
+            return None
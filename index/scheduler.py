@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import threading
+import traceback
+
+
+class Job(object):
+    """
+    A unit of work queued on the Scheduler. Jobs are identified by a key, so
+    submitting work for a key that is already queued updates the queued job
+    instead of adding another one.
+    """
+
+    key = None
+
+    function = None
+
+    priority = None
+
+    owners = None
+
+    pinned = False
+
+    cancelled = False
+
+    result = None
+
+    callbacks = None
+
+    def __init__(self, key, function, priority):
+        self.key = key
+        self.function = function
+        self.priority = priority
+        self.owners = set()
+        self.callbacks = []
+
+    def run(self):
+        try:
+            self.result = self.function()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            self.finish()
+
+    def finish(self):
+        for callback in self.callbacks:
+            callback(self)
+
+
+class Scheduler(object):
+    """
+    Runs jobs on a fixed pool of worker threads, always picking the queued job
+    with the most urgent priority class. Running jobs are never interrupted,
+    but urgent work overtakes everything still queued.
+
+    Jobs submitted with an owner, such as a window id, are cancelled once all
+    of their owners are cancelled. Jobs submitted without one always run.
+    """
+
+    ACTIVE = 0
+
+    OPEN = 1
+
+    NEARBY = 2
+
+    BACKGROUND = 3
+
+    queue = None
+
+    jobs = None
+
+    counter = None
+
+    condition = None
+
+    running = True
+
+    def __init__(self, workers):
+        self.queue = []
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+
+        for _ in range(workers):
+            threading.Thread(target=self.work, daemon=True).start()
+
+    def submit(self, key, function, priority=BACKGROUND, owner=None, callback=None):
+        with self.condition:
+            job = self.jobs.get(key)
+
+            if job is None:
+                job = Job(key, function, priority)
+
+                self.jobs[key] = job
+
+                self.push(job)
+            else:
+                job.function = function
+
+                if priority < job.priority:
+                    job.priority = priority
+
+                    self.push(job)
+
+            if owner is None:
+                job.pinned = True
+            else:
+                job.owners.add(owner)
+
+            if callback is not None:
+                job.callbacks.append(callback)
+
+            self.condition.notify()
+
+        return job
+
+    def push(self, job):
+        # Re-prioritized jobs are pushed again, the outdated heap entry is
+        # skipped once popped because its priority no longer matches.
+        heapq.heappush(self.queue, (job.priority, next(self.counter), job))
+
+    def cancel(self, owner):
+        cancelled = []
+
+        with self.condition:
+            for key, job in list(self.jobs.items()):
+                if owner in job.owners:
+                    job.owners.discard(owner)
+
+                    if not job.owners and not job.pinned:
+                        job.cancelled = True
+
+                        del self.jobs[key]
+
+                        cancelled.append(job)
+
+        for job in cancelled:
+            job.finish()
+
+        return len(cancelled)
+
+    def shutdown(self):
+        with self.condition:
+            self.running = False
+
+            cancelled = list(self.jobs.values())
+
+            for job in cancelled:
+                job.cancelled = True
+
+            self.jobs.clear()
+
+            self.condition.notify_all()
+
+        for job in cancelled:
+            job.finish()
+
+    def next_job(self):
+        with self.condition:
+            while True:
+                while self.running and not self.queue:
+                    self.condition.wait()
+
+                if not self.running:
+                    return None
+
+                priority, _, job = heapq.heappop(self.queue)
+
+                if job.priority == priority and self.jobs.get(job.key) is job:
+                    del self.jobs[job.key]
+
+                    return job
+
+    def work(self):
+        while True:
+            job = self.next_job()
+
+            if job is None:
+                break
+
+            job.run()
@@ -0,0 +1,140 @@
+import threading
+import time
+
+
+class IndexingStats(object):
+    """
+    Collects the duration and memory use of every parse and reparse done by
+    a TranslationUnitDatabase, and the throughput of every indexing batch.
+    """
+
+    records = None
+
+    batches = None
+
+    lock = None
+
+    def __init__(self):
+        self.records = {}
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def record(self, file_name, kind, started, memory):
+        """
+        Records a parse or reparse of file_name that began at started, kind is
+        either 'parse' or 'reparse' and memory is the unit's size in bytes.
+        Times of repeated parses add up, the slowest one is kept separately.
+        """
+
+        elapsed = time.time() - started
+
+        with self.lock:
+            record = self.records.setdefault(file_name, {
+                'file': file_name,
+                'parses': 0,
+                'parse_time': 0.0,
+                'max_parse_time': 0.0,
+                'reparses': 0,
+                'reparse_time': 0.0,
+                'max_reparse_time': 0.0,
+                'memory': 0
+            })
+
+            record[kind + 's'] += 1
+            record[kind + '_time'] += elapsed
+            record['max_' + kind + '_time'] = max(record['max_' + kind + '_time'], elapsed)
+            record['memory'] = memory
+
+    def record_batch(self, parsed, started, workers):
+        """Records an indexing batch of parsed files that began at started."""
+
+        elapsed = max(time.time() - started, 1e-6)
+
+        batch = {
+            'parsed': parsed,
+            'started': started,
+            'elapsed': elapsed,
+            'throughput': parsed / elapsed,
+            'workers': workers
+        }
+
+        with self.lock:
+            self.batches.append(batch)
+
+        return batch
+
+    def dump(self):
+        with self.lock:
+            return {
+                'records': [dict(record) for record in self.records.values()],
+                'batches': [dict(batch) for batch in self.batches]
+            }
+
+    def merge(self, dump):
+        """Adds the records of another IndexingStats.dump() to these."""
+
+        with self.lock:
+            for record in dump['records']:
+                self.records[record['file']] = record
+
+            self.batches.extend(dump['batches'])
+
+            self.batches.sort(key=lambda batch: batch['started'])
+
+    def report(self, limit=10):
+        with self.lock:
+            records = [dict(record) for record in self.records.values()]
+
+            batches = [dict(batch) for batch in self.batches]
+
+        return {
+            'translation_units': len(records),
+            'parses': sum(record['parses'] for record in records),
+            'reparses': sum(record['reparses'] for record in records),
+            'parse_time': sum(record['parse_time'] for record in records),
+            'memory': sum(record['memory'] for record in records),
+            'batches': batches,
+            'slowest': sorted(
+                records,
+                key=lambda record: record['max_parse_time'],
+                reverse=True
+            )[:limit],
+            'largest': sorted(
+                records,
+                key=lambda record: record['memory'],
+                reverse=True
+            )[:limit]
+        }
+
+
+def format_report(report):
+    megabyte = 1024.0 * 1024.0
+
+    lines = [
+        'Translation units: %d' % report['translation_units'],
+        'Parses: %d, reparses: %d' % (report['parses'], report['reparses']),
+        'Total parse time: %.2fs' % report['parse_time'],
+        'Total memory: %.1f MB' % (report['memory'] / megabyte),
+        '',
+        'Indexing batches:'
+    ]
+
+    for batch in report['batches']:
+        lines.append('  %d files in %.2fs (%.1f files/s, %d workers)' % (
+            batch['parsed'],
+            batch['elapsed'],
+            batch['throughput'],
+            batch['workers']
+        ))
+
+    lines.extend(['', 'Slowest translation units:'])
+
+    for record in report['slowest']:
+        lines.append('  %8.2fs  %s' % (record['max_parse_time'], record['file']))
+
+    lines.extend(['', 'Largest translation units:'])
+
+    for record in report['largest']:
+        lines.append('  %8.1f MB  %s' % (record['memory'] / megabyte, record['file']))
+
+    return '\n'.join(lines) + '\n'
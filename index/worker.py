@@ -0,0 +1,176 @@
+"""
+Hosts a TranslationUnitDatabase in a process of its own, so long parses do
+not stall the editor and a crashing libclang only takes this process down.
+
+The worker is started by index.remote.WorkerProcess with the package's
+parent directory on PYTHONPATH:
+
+    python3 -m SeaBlime.index.worker [--library-path PATH] [--library-file FILE]
+
+Requests and responses are exchanged over stdin and stdout using
+index.ipc. Each request carries an "op" and, if it expects a response, an
+"id" which is echoed back along with either a "result" or an "error".
+"""
+
+import argparse
+import sys
+import threading
+import traceback
+
+from ..clang import cindex
+
+from .database import TranslationUnitDatabase
+from .ipc import receive_message, send_message
+
+
+def encode_unsaved_files(unsaved_files):
+    return [(name.encode(), contents.encode()) for name, contents in unsaved_files or []]
+
+
+class WorkerServer(object):
+
+    database = None
+
+    output = None
+
+    output_lock = None
+
+    def __init__(self, output):
+        self.output = output
+        self.output_lock = threading.Lock()
+
+    def send(self, message):
+        with self.output_lock:
+            send_message(self.output, message)
+
+    def progress(self, message):
+        self.send({'event': 'progress', 'message': message})
+
+    def dispatch(self, message):
+        if message['op'] in ('open', 'close'):
+            # Every other request depends on the database, so it is opened
+            # before any further message is read, and closed after all.
+            self.handle(message)
+        else:
+            threading.Thread(target=self.handle, args=(message,), daemon=True).start()
+
+    def handle(self, message):
+        request_id = message.pop('id', None)
+        handler = getattr(self, 'op_%s' % message.pop('op'))
+
+        try:
+            response = {'result': handler(**message)}
+        except Exception as e:
+            traceback.print_exc()
+
+            response = {'error': '%s: %s' % (type(e).__name__, e)}
+
+        if request_id is not None:
+            response['id'] = request_id
+
+            self.send(response)
+
+    def op_open(self, build_directory, partition=None, **options):
+        self.database = TranslationUnitDatabase(
+            build_directory,
+            partition=partition,
+            **options
+        )
+
+        self.database.on_progress = self.progress
+
+    def op_index_project(self):
+        self.database.index_project()
+
+    def op_prioritize(self, active_file, open_files, owner=None):
+        self.database.prioritize(active_file, open_files, owner)
+
+    def op_schedule(self, file_name, priority, owner=None, profile='background'):
+        self.database.schedule(file_name, priority, owner, profile)
+
+    def op_cancel(self, owner):
+        return self.database.cancel(owner)
+
+    def op_stats(self):
+        return self.database.stats.dump()
+
+    def op_resolve(self, file_name):
+        return self.database.resolve(file_name)
+
+    def op_schedule_reparse(self, file_name, unsaved_files=None, version=None):
+        self.database.schedule_reparse(
+            file_name,
+            encode_unsaved_files(unsaved_files),
+            version
+        )
+
+    def op_complete(self, source, file_name, line, column, unsaved_files=None,
+                    global_scope=False):
+        return self.database.complete(
+            source,
+            file_name.encode(),
+            line,
+            column,
+            encode_unsaved_files(unsaved_files),
+            global_scope,
+            lazy=False
+        )
+
+    def op_documentation(self, source, file_name, line, column, typed_text,
+                         representation, unsaved_files=None):
+        return self.database.documentation(
+            source,
+            file_name.encode(),
+            line,
+            column,
+            typed_text,
+            representation,
+            encode_unsaved_files(unsaved_files)
+        )
+
+    def op_refresh(self):
+        self.database.refresh()
+
+    def op_close(self):
+        self.database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--library-path')
+    parser.add_argument('--library-file')
+
+    arguments = parser.parse_args()
+
+    if arguments.library_path:
+        cindex.conf.set_library_path(arguments.library_path)
+
+    if arguments.library_file:
+        cindex.conf.set_library_file(arguments.library_file)
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+
+    # Anything printed goes to stderr, which WorkerProcess prints to the
+    # editor's console, instead of corrupting the message stream.
+    sys.stdout = sys.stderr
+
+    server = WorkerServer(stdout)
+
+    while True:
+        message = receive_message(stdin)
+
+        if message is None:
+            break
+
+        # handle() pops the op from the message
+        op = message.get('op')
+
+        server.dispatch(message)
+
+        if op == 'close':
+            break
+
+
+if __name__ == '__main__':
+    main()
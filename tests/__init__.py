@@ -0,0 +1,6 @@
+"""
+Unit tests for the modules that do not need libclang or Sublime Text. Run
+from the directory containing the package:
+
+    python3 -m unittest discover -s SeaBlime/tests -t .
+"""
@@ -0,0 +1,121 @@
+import contextlib
+import io
+import threading
+import unittest
+
+from ..completion.asynchronous import CompletionQueue
+
+
+class Blocker(object):
+    """A completion function that runs until it is released."""
+
+    def __init__(self, completions):
+        self.completions = completions
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        self.released.wait(5)
+
+        return self.completions
+
+
+class CompletionQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = CompletionQueue()
+        self.delivered = {}
+        self.done = {}
+
+    def submit(self, view_id, request, function):
+        self.done[request] = threading.Event()
+
+        def callback(completions):
+            self.delivered[request] = completions
+
+            self.done[request].set()
+
+        self.queue.submit(view_id, request, function, callback)
+
+    def test_results_are_taken_by_request(self):
+        self.submit(1, (10, 1), lambda: ['item'])
+
+        self.assertTrue(self.done[(10, 1)].wait(5))
+
+        self.assertEqual(self.delivered[(10, 1)], ['item'])
+        self.assertEqual(self.queue.take(1, (10, 1)), ['item'])
+        self.assertIsNone(self.queue.take(1, (10, 2)))
+        self.assertFalse(self.queue.is_pending(1, (10, 1)))
+
+    def test_superseded_results_are_discarded(self):
+        running = Blocker(['old'])
+
+        self.submit(1, (10, 1), running)
+
+        self.assertTrue(running.started.wait(5))
+        self.assertTrue(self.queue.is_pending(1, (10, 1)))
+
+        self.submit(1, (10, 2), lambda: ['new'])
+
+        self.assertFalse(self.queue.is_pending(1, (10, 1)))
+
+        running.released.set()
+
+        self.assertTrue(self.done[(10, 2)].wait(5))
+
+        self.assertNotIn((10, 1), self.delivered)
+        self.assertIsNone(self.queue.take(1, (10, 1)))
+        self.assertEqual(self.queue.take(1, (10, 2)), ['new'])
+
+    def test_queued_requests_are_replaced(self):
+        running = Blocker([])
+
+        self.submit(1, (0, 1), running)
+
+        self.assertTrue(running.started.wait(5))
+
+        calls = []
+
+        self.submit(2, (10, 1), lambda: calls.append('first'))
+        self.submit(2, (10, 2), lambda: calls.append('second'))
+
+        running.released.set()
+
+        self.assertTrue(self.done[(10, 2)].wait(5))
+
+        self.assertEqual(calls, ['second'])
+
+    def test_wait_returns_finished_results(self):
+        running = Blocker(['item'])
+
+        self.submit(1, (10, 1), running)
+
+        threading.Timer(0.05, running.released.set).start()
+
+        self.assertEqual(self.queue.wait(1, (10, 1), 5), ['item'])
+
+    def test_wait_times_out(self):
+        running = Blocker(['item'])
+
+        self.submit(1, (10, 1), running)
+
+        self.assertIsNone(self.queue.wait(1, (10, 1), 0.05))
+
+        running.released.set()
+
+    def test_wait_returns_once_a_request_failed(self):
+        def fail():
+            raise RuntimeError('completion failed')
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.submit(1, (10, 1), fail)
+
+            self.assertIsNone(self.queue.wait(1, (10, 1), 5))
+
+        self.assertFalse(self.queue.is_pending(1, (10, 1)))
+        self.assertFalse(self.done[(10, 1)].is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from ..completion.cache import CompletionCache
+
+
+def candidate(typed_text, priority=50):
+    return typed_text, typed_text, typed_text, priority
+
+
+class CompletionCacheKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CompletionCache()
+
+    def test_typing_after_the_start_keeps_the_key(self):
+        key = self.cache.key('main.cpp', 1, 10)
+
+        self.cache.modified(1, 11)
+        self.cache.modified(1, 12)
+
+        self.assertEqual(self.cache.key('main.cpp', 1, 10), key)
+
+    def test_edits_before_the_start_change_the_key(self):
+        key = self.cache.key('main.cpp', 1, 10)
+
+        self.cache.modified(1, 4)
+
+        self.assertNotEqual(self.cache.key('main.cpp', 1, 10), key)
+
+    def test_another_start_changes_the_key(self):
+        key = self.cache.key('main.cpp', 1, 10)
+
+        self.cache.key('main.cpp', 1, 20)
+
+        self.assertNotEqual(self.cache.key('main.cpp', 1, 10), key)
+
+    def test_views_have_anchors_of_their_own(self):
+        key = self.cache.key('main.cpp', 1, 10)
+
+        self.cache.key('main.cpp', 2, 10)
+        self.cache.modified(2, 4)
+
+        self.assertEqual(self.cache.key('main.cpp', 1, 10), key)
+
+    def test_forgotten_views_get_a_new_key(self):
+        key = self.cache.key('main.cpp', 1, 10)
+
+        self.cache.forget(1)
+
+        self.assertNotEqual(self.cache.key('main.cpp', 1, 10), key)
+
+
+class CompletionCacheEntryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CompletionCache()
+        self.key = self.cache.key('main.cpp', 1, 10)
+
+        self.cache.put(self.key, [candidate('push_back'), candidate('pop_back')])
+
+    def test_ranks_cached_results(self):
+        self.assertIn(self.key, self.cache)
+        self.assertEqual(self.cache.get(self.key, 'pu'), [('push_back', 'push_back')])
+
+    def test_outdated_keys_miss(self):
+        self.cache.modified(1, 4)
+
+        key = self.cache.key('main.cpp', 1, 10)
+
+        self.assertNotIn(key, self.cache)
+        self.assertIsNone(self.cache.get(key, 'pu'))
+        self.assertIsNone(self.cache.find(key, 'push_back'))
+
+    def test_find(self):
+        self.assertEqual(self.cache.find(self.key, 'pop_back()'), ('pop_back', 'pop_back'))
+
+    def test_discard(self):
+        self.cache.discard('main.cpp')
+
+        self.assertIsNone(self.cache.get(self.key, ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os.path
+import unittest
+
+from ..index.includes import IncludeIndex
+
+
+class FakeFile(object):
+
+    def __init__(self, name):
+        self.name = name.encode()
+
+
+class FakeInclusion(object):
+
+    def __init__(self, header):
+        self.include = FakeFile(header)
+
+
+class FakeTranslationUnit(object):
+    """Stands in for the include list of a cindex.TranslationUnit."""
+
+    def __init__(self, *headers):
+        self.headers = headers
+
+    def get_includes(self):
+        return [FakeInclusion(header) for header in self.headers]
+
+
+header = os.path.normpath('/project/include/vector.h')
+
+other_header = os.path.normpath('/project/include/string.h')
+
+
+class IncludeIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = IncludeIndex()
+
+    def test_finds_the_cheapest_includer(self):
+        self.index.update('big.cpp', FakeTranslationUnit(header, other_header))
+        self.index.update('small.cpp', FakeTranslationUnit(header))
+
+        self.assertEqual(self.index.find(header), 'small.cpp')
+        self.assertEqual(self.index.find(other_header), 'big.cpp')
+
+    def test_ties_are_broken_by_file_name(self):
+        self.index.update('b.cpp', FakeTranslationUnit(header))
+        self.index.update('a.cpp', FakeTranslationUnit(header))
+
+        self.assertEqual(self.index.find(header), 'a.cpp')
+
+    def test_header_paths_are_normalized(self):
+        self.index.update('main.cpp', FakeTranslationUnit('/project/src/../include/vector.h'))
+
+        self.assertIn(header, self.index)
+
+    def test_update_replaces_the_includes(self):
+        self.index.update('main.cpp', FakeTranslationUnit(header))
+        self.index.update('main.cpp', FakeTranslationUnit(other_header))
+
+        self.assertIsNone(self.index.find(header))
+        self.assertEqual(self.index.find(other_header), 'main.cpp')
+
+    def test_discard(self):
+        self.index.update('main.cpp', FakeTranslationUnit(header))
+
+        self.index.discard('main.cpp')
+
+        self.assertNotIn(header, self.index)
+        self.assertIsNone(self.index.find(header))
+
+
+if __name__ == '__main__':
+    unittest.main()
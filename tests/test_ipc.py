@@ -0,0 +1,75 @@
+import io
+import unittest
+
+from ..index.ipc import header, receive_message, send_message
+
+
+class Trickle(io.RawIOBase):
+    """Returns at most one byte per read, like a pipe under load."""
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self.data.read(min(size, 1) if size > 0 else 1)
+
+
+class IpcTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        stream = io.BytesIO()
+
+        send_message(stream, {'op': 'complete', 'file_name': 'main.cpp', 'line': 1})
+        send_message(stream, {'id': 3, 'result': [['push_back', 'push_back']]})
+
+        stream.seek(0)
+
+        self.assertEqual(
+            receive_message(stream),
+            {'op': 'complete', 'file_name': 'main.cpp', 'line': 1}
+        )
+        self.assertEqual(receive_message(stream), {'id': 3, 'result': [['push_back', 'push_back']]})
+        self.assertIsNone(receive_message(stream))
+
+    def test_length_prefix(self):
+        stream = io.BytesIO()
+
+        send_message(stream, {'op': 'close'})
+
+        data = stream.getvalue()
+
+        self.assertEqual(header.unpack(data[:header.size])[0], len(data) - header.size)
+        self.assertEqual(data[header.size:], b'{"op":"close"}')
+
+    def test_non_ascii_contents(self):
+        stream = io.BytesIO()
+
+        send_message(stream, {'contents': '// größe'})
+
+        stream.seek(0)
+
+        self.assertEqual(receive_message(stream), {'contents': '// größe'})
+
+    def test_short_reads(self):
+        stream = io.BytesIO()
+
+        send_message(stream, {'op': 'stats'})
+
+        self.assertEqual(receive_message(Trickle(stream.getvalue())), {'op': 'stats'})
+
+    def test_truncated_messages(self):
+        stream = io.BytesIO()
+
+        send_message(stream, {'op': 'stats'})
+
+        data = stream.getvalue()
+
+        self.assertIsNone(receive_message(io.BytesIO(data[:2])))
+        self.assertIsNone(receive_message(io.BytesIO(data[:-1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
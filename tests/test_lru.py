@@ -0,0 +1,88 @@
+import unittest
+
+from ..index.lru import TranslationUnitCache
+
+
+class FakeTranslationUnit(object):
+    """Reports its memory the way cindex.TranslationUnit.resource_usage does."""
+
+    def __init__(self, cost):
+        self.resource_usage = {'AST': cost}
+
+
+class TranslationUnitCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = TranslationUnitCache(100)
+
+        cache['a.cpp'] = FakeTranslationUnit(40)
+        cache['b.cpp'] = FakeTranslationUnit(40)
+
+        cache.get('a.cpp')
+
+        cache['c.cpp'] = FakeTranslationUnit(40)
+
+        self.assertIsNone(cache.peek('b.cpp'))
+        self.assertIsNotNone(cache.peek('a.cpp'))
+        self.assertEqual(cache.total, 80)
+
+    def test_peek_does_not_mark_as_used(self):
+        cache = TranslationUnitCache(100)
+
+        cache['a.cpp'] = FakeTranslationUnit(40)
+        cache['b.cpp'] = FakeTranslationUnit(40)
+
+        cache.peek('a.cpp')
+
+        cache['c.cpp'] = FakeTranslationUnit(40)
+
+        self.assertIsNone(cache.peek('a.cpp'))
+
+    def test_keeps_the_last_unit_over_budget(self):
+        cache = TranslationUnitCache(100)
+
+        cache['a.cpp'] = FakeTranslationUnit(40)
+        cache['b.cpp'] = FakeTranslationUnit(200)
+
+        self.assertIsNone(cache.peek('a.cpp'))
+        self.assertIsNotNone(cache.peek('b.cpp'))
+
+    def test_remeasure_evicts_after_growth(self):
+        cache = TranslationUnitCache(100)
+
+        cache['a.cpp'] = FakeTranslationUnit(40)
+        cache['b.cpp'] = FakeTranslationUnit(40)
+
+        cache.peek('b.cpp').resource_usage['AST'] = 80
+
+        cache.remeasure('b.cpp')
+
+        self.assertIsNone(cache.peek('a.cpp'))
+        self.assertEqual(cache.costs, {'b.cpp': 80})
+
+    def test_unbounded_without_budget(self):
+        cache = TranslationUnitCache()
+
+        for index in range(10):
+            cache['%d.cpp' % index] = FakeTranslationUnit(1000)
+
+        self.assertEqual(cache.total, 10000)
+
+    def test_units_without_usage_cost_nothing(self):
+        cache = TranslationUnitCache(100)
+
+        cache['a.cpp'] = object()
+
+        self.assertEqual(cache.costs, {'a.cpp': 0})
+
+    def test_pop(self):
+        cache = TranslationUnitCache(100)
+
+        unit = cache['a.cpp'] = FakeTranslationUnit(40)
+
+        self.assertIs(cache.pop('a.cpp'), unit)
+        self.assertEqual(cache.total, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from ..completion.ranking import CandidateTable, is_subsequence, word_boundaries
+
+
+def candidate(typed_text, priority=50):
+    return typed_text, typed_text, typed_text, priority
+
+
+def typed_texts(items):
+    return [item[1] for item in items]
+
+
+class WordBoundariesTest(unittest.TestCase):
+
+    def test_camel_case(self):
+        self.assertEqual(word_boundaries('maxBandAll'), 'm\0\0b\0\0\0a\0\0')
+
+    def test_acronym(self):
+        self.assertEqual(word_boundaries('HTTPResponse'), 'h\0\0\0r\0\0\0\0\0\0\0')
+
+    def test_underscore_and_digits(self):
+        self.assertEqual(word_boundaries('get_x2'), 'g\0\0\0x2')
+
+
+class IsSubsequenceTest(unittest.TestCase):
+
+    def test_subsequence(self):
+        self.assertTrue(is_subsequence('ab', 'maxband'))
+        self.assertTrue(is_subsequence('', 'anything'))
+
+    def test_start(self):
+        self.assertFalse(is_subsequence('b', 'maxband', 4))
+
+
+class CandidateTableTest(unittest.TestCase):
+
+    def test_prefix_matches_first(self):
+        table = CandidateTable([candidate('get_value'), candidate('value')])
+
+        self.assertEqual(typed_texts(table.rank('val')), ['value', 'get_value'])
+
+    def test_word_boundaries_rank_above_inner_matches(self):
+        table = CandidateTable([candidate('absent'), candidate('byteSize')])
+
+        self.assertEqual(typed_texts(table.rank('bs')), ['byteSize', 'absent'])
+
+    def test_boundary_jump_keeps_the_only_alignment(self):
+        table = CandidateTable([candidate('maxBandAll')])
+
+        self.assertEqual(typed_texts(table.rank('ab')), ['maxBandAll'])
+
+        table = CandidateTable([candidate('xaByA')])
+
+        self.assertEqual(typed_texts(table.rank('ab')), ['xaByA'])
+
+    def test_no_match(self):
+        table = CandidateTable([candidate('maxBandAll')])
+
+        self.assertEqual(table.rank('ba x'), [])
+
+    def test_priority_breaks_ties(self):
+        table = CandidateTable([candidate('size', 60), candidate('sizeof', 30)])
+
+        self.assertEqual(typed_texts(table.rank('')), ['sizeof', 'size'])
+
+    def test_narrowing_while_typing(self):
+        table = CandidateTable([
+            candidate('maxBandAll'),
+            candidate('other'),
+            candidate('mba')
+        ])
+
+        for query in ('a', 'ab'):
+            table.rank(query)
+
+        self.assertEqual(typed_texts(table.rank('abl')), ['maxBandAll'])
+
+    def test_limit(self):
+        table = CandidateTable([candidate('item%d' % index, index) for index in range(10)])
+
+        self.assertEqual(typed_texts(table.rank('item', 3)), ['item0', 'item1', 'item2'])
+
+    def test_find(self):
+        table = CandidateTable([candidate('push'), candidate('push_back')])
+
+        self.assertEqual(table.find('push_back(value);')[0], 'push_back')
+        self.assertIsNone(table.find('pop'))
+
+    def test_materializes_selected_candidates_only(self):
+        built = []
+
+        def materialize(indices):
+            built.extend(indices)
+
+            return [('item%d' % index, 'item%d' % index) for index in indices]
+
+        table = CandidateTable(
+            [(None, None, 'item%d' % index, index) for index in range(10)],
+            materialize
+        )
+
+        self.assertEqual(typed_texts(table.rank('item', 2)), ['item0', 'item1'])
+        self.assertEqual(typed_texts(table.rank('item', 3)), ['item0', 'item1', 'item2'])
+        self.assertEqual(built, [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
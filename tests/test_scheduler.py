@@ -0,0 +1,139 @@
+import contextlib
+import io
+import threading
+import unittest
+
+from ..index.scheduler import Scheduler
+
+
+def constant(value):
+    return lambda: value
+
+
+class SchedulerQueueTest(unittest.TestCase):
+    """Runs without worker threads, jobs are taken with next_job."""
+
+    def setUp(self):
+        self.scheduler = Scheduler(0)
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_urgent_jobs_overtake_queued_ones(self):
+        self.scheduler.submit('background', constant(None), Scheduler.BACKGROUND)
+        self.scheduler.submit('open', constant(None), Scheduler.OPEN)
+        self.scheduler.submit('active', constant(None), Scheduler.ACTIVE)
+
+        order = [self.scheduler.next_job().key for _ in range(3)]
+
+        self.assertEqual(order, ['active', 'open', 'background'])
+
+    def test_same_priority_runs_in_submission_order(self):
+        for key in ('first', 'second', 'third'):
+            self.scheduler.submit(key, constant(None), Scheduler.NEARBY)
+
+        order = [self.scheduler.next_job().key for _ in range(3)]
+
+        self.assertEqual(order, ['first', 'second', 'third'])
+
+    def test_resubmitting_raises_priority_once(self):
+        self.scheduler.submit('header', constant(None), Scheduler.BACKGROUND)
+        self.scheduler.submit('source', constant(None), Scheduler.OPEN)
+        self.scheduler.submit('header', constant(None), Scheduler.ACTIVE)
+
+        self.assertEqual(self.scheduler.next_job().key, 'header')
+        self.assertEqual(self.scheduler.next_job().key, 'source')
+        self.assertEqual(self.scheduler.jobs, {})
+
+    def test_resubmitting_never_lowers_priority(self):
+        job = self.scheduler.submit('source', constant(None), Scheduler.ACTIVE)
+
+        self.scheduler.submit('source', constant(None), Scheduler.BACKGROUND)
+
+        self.assertEqual(job.priority, Scheduler.ACTIVE)
+
+    def test_resubmitting_replaces_the_function(self):
+        self.scheduler.submit('reparse', constant('old'))
+        self.scheduler.submit('reparse', constant('new'))
+
+        job = self.scheduler.next_job()
+
+        job.run()
+
+        self.assertEqual(job.result, 'new')
+
+    def test_cancel_waits_for_every_owner(self):
+        finished = []
+
+        self.scheduler.submit('source', constant(None), owner=1, callback=finished.append)
+        self.scheduler.submit('source', constant(None), owner=2)
+
+        self.assertEqual(self.scheduler.cancel(1), 0)
+        self.assertIn('source', self.scheduler.jobs)
+
+        self.assertEqual(self.scheduler.cancel(2), 1)
+        self.assertNotIn('source', self.scheduler.jobs)
+
+        self.assertEqual(len(finished), 1)
+        self.assertTrue(finished[0].cancelled)
+
+    def test_pinned_jobs_are_not_cancelled(self):
+        self.scheduler.submit('store', constant(None), owner=1)
+        self.scheduler.submit('store', constant(None))
+
+        self.assertEqual(self.scheduler.cancel(1), 0)
+        self.assertEqual(self.scheduler.next_job().key, 'store')
+
+    def test_shutdown_finishes_queued_jobs(self):
+        finished = []
+
+        self.scheduler.submit('source', constant(None), callback=finished.append)
+
+        self.scheduler.shutdown()
+
+        self.assertTrue(finished[0].cancelled)
+        self.assertIsNone(self.scheduler.next_job())
+
+
+class SchedulerWorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler(1)
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def run_job(self, function):
+        done = threading.Event()
+        finished = []
+
+        def callback(job):
+            finished.append(job)
+
+            done.set()
+
+        self.scheduler.submit('job', function, callback=callback)
+
+        self.assertTrue(done.wait(5))
+
+        return finished[0]
+
+    def test_runs_jobs(self):
+        job = self.run_job(constant(42))
+
+        self.assertEqual(job.result, 42)
+        self.assertFalse(job.cancelled)
+
+    def test_failing_jobs_still_finish(self):
+        def fail():
+            raise ValueError('parse failed')
+
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            job = self.run_job(fail)
+
+        self.assertIsNone(job.result)
+        self.assertIn('parse failed', errors.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,14 +5,14 @@ settings_key = 'cmake'
 
 
 def set_setting(window, key, value):
-    project_settings = window.project_data().get('settings', {})
+    project_data = window.project_data() or {}
+
+    project_settings = project_data.get('settings', {})
 
     cmake_settings = project_settings.get(settings_key, {})
 
     cmake_settings[key] = value
 
-    project_data = window.project_data()
-
     if 'settings' not in project_data:
         project_data['settings'] = {}
 
@@ -22,7 +22,8 @@ def set_setting(window, key, value):
 
 
 def get_setting(window, key, default=None):
-    project_settings = window.project_data().get('settings', {})
+    # Windows without a project have no project data
+    project_settings = (window.project_data() or {}).get('settings', {})
 
     cmake_settings = project_settings.get(settings_key, {})
 
@@ -30,7 +31,7 @@ def get_setting(window, key, default=None):
 
 
 def has_settings(window):
-    return settings_key not in window.project_data().get('settings', {})
+    return settings_key not in (window.project_data() or {}).get('settings', {})
 
 
 class Setting(object):
@@ -60,6 +61,32 @@ class Settings(object):
 
     cmake_lists = Setting('CMakeLists.txt')
 
+    index_workers = Setting('index_workers')
+
+    lazy_index = Setting('lazy_index', False)
+
+    index_memory_budget = Setting('index_memory_budget')
+
+    ast_cache = Setting('ast_cache', True)
+
+    parse_profiles = Setting('parse_profiles', {})
+
+    reparse_delay = Setting('reparse_delay', 500)
+
+    out_of_process = Setting('out_of_process', False)
+
+    worker_processes = Setting('worker_processes', 1)
+
+    worker_python = Setting('worker_python', 'python3')
+
+    async_completion = Setting('async_completion', False)
+
+    max_completions = Setting('max_completions', 500)
+
+    speculative_completion = Setting('speculative_completion', True)
+
+    completion_documentation = Setting('completion_documentation', False)
+
     def __init__(self, window=None):
         if window is None:
             window = sublime.active_window()
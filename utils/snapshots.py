@@ -0,0 +1,49 @@
+import threading
+
+import sublime
+
+
+class BufferSnapshots(object):
+    """
+    Keeps the UTF-8 encoded contents of every modified view, encoded at most
+    once per change count. Completion, reparsing and diagnostics of the same
+    buffer state all share one bytes object, which ctypes hands to libclang
+    as the unsaved file without copying it again.
+
+    A new change count still encodes the whole buffer, on_modified does not
+    tell which regions changed in Sublime Text 3. Index workers receive the
+    contents decoded and encoded as JSON once more per request.
+    """
+
+    snapshots = None
+
+    lock = None
+
+    def __init__(self):
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    def get(self, view):
+        """Returns the encoded contents of view at its current change count."""
+
+        change_count = view.change_count()
+
+        with self.lock:
+            snapshot = self.snapshots.get(view.id())
+
+        if snapshot is not None and snapshot[0] == change_count:
+            return snapshot[1]
+
+        contents = view.substr(sublime.Region(0, view.size())).encode()
+
+        # The view may have changed while it was read, in which case the
+        # contents are returned but not kept for the newer change count.
+        if view.change_count() == change_count:
+            with self.lock:
+                self.snapshots[view.id()] = (change_count, contents)
+
+        return contents
+
+    def discard(self, view_id):
+        with self.lock:
+            self.snapshots.pop(view_id, None)